@@ -7,7 +7,7 @@ from flask_cors import CORS
 
 # Import services and managers
 from backend.config import ConfigManager
-from backend.services import ChromecastScanner, CronManager, MawaqitClient, UnsplashClient
+from backend.services import CastConnectionPool, ChromecastScanner, CronManager, DiscoveryService, JobRunner, MawaqitClient, PlayServer, PrayerScheduler, RunHistory, RunLogArchive, UnsplashClient
 
 # Import route blueprints
 from backend.routes import (
@@ -22,6 +22,18 @@ PRODUCTION = os.path.exists(STATIC_FOLDER)
 CONFIG_DIR = os.environ.get("CONFIG_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "uploads")
 
+# "cron" (one crontab job per prayer) or "inprocess" (timer thread inside the backend)
+SCHEDULER_BACKEND = os.environ.get("SCHEDULER_BACKEND", "cron")
+
+# Serve play requests from play_adhan.py over a Unix socket ("0" to disable)
+PLAY_IPC = os.environ.get("PLAY_IPC", "1") != "0"
+
+# Keep browsing for Chromecasts in the background instead of once per scan/play ("0" to disable)
+DISCOVERY_SERVICE = os.environ.get("DISCOVERY_SERVICE", "1") != "0"
+
+# Keep Chromecast connections open between plays ("0" to connect and disconnect every time)
+CAST_POOL = os.environ.get("CAST_POOL", "1") != "0"
+
 # Ensure uploads directory exists
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -33,10 +45,33 @@ async def create_app():
     
     # Initialize services and managers
     config_manager = ConfigManager(config_dir=CONFIG_DIR)
-    chromecast_scanner = ChromecastScanner()
+    discovery = None
+    if DISCOVERY_SERVICE:
+        discovery = DiscoveryService()
+        try:
+            discovery.start()
+        except Exception as e:
+            print(f"Chromecast discovery service not available: {e}")
+            discovery = None
+    chromecast_scanner = ChromecastScanner(discovery, config_manager)
+    if CAST_POOL:
+        chromecast_scanner.pool = CastConnectionPool(chromecast_scanner.connect)
+        chromecast_scanner.pool.start()
     cron_manager = CronManager()
     mawaqit_client = MawaqitClient()
     unsplash_client = UnsplashClient(config_manager)
+    run_history = RunHistory(CONFIG_DIR)
+    run_logs = RunLogArchive(cron_manager.log_dir)
+    job_runner = JobRunner()
+
+    # Both schedulers expose the same schedule_prayers/get_scheduled_jobs/... methods
+    if SCHEDULER_BACKEND == "inprocess":
+        prayer_scheduler = PrayerScheduler(
+            chromecast_scanner, config_manager, mawaqit_client, UPLOAD_FOLDER,
+            run_history=run_history, run_logs=run_logs
+        )
+    else:
+        prayer_scheduler = cron_manager
     
     # Initialize route blueprints with dependencies
     from backend.routes.config import init_managers as init_config_managers
@@ -47,12 +82,12 @@ async def create_app():
     from backend.routes.test import init_scanner as init_test_scanner
     from backend.routes.screensaver import init_client as init_screensaver_client
 
-    init_config_managers(config_manager, cron_manager)
-    init_mosques_services(mawaqit_client, config_manager, cron_manager)
+    init_config_managers(config_manager, prayer_scheduler)
+    init_mosques_services(mawaqit_client, config_manager, prayer_scheduler)
     init_chromecasts_scanner(chromecast_scanner)
     init_files(UPLOAD_FOLDER)
-    init_cron_manager(cron_manager)
-    init_test_scanner(chromecast_scanner)
+    init_cron_manager(prayer_scheduler, run_history, run_logs)
+    init_test_scanner(chromecast_scanner, job_runner)
     init_screensaver_client(unsplash_client)
     
     # Register blueprints
@@ -66,8 +101,21 @@ async def create_app():
 
     # Serve React app for production
     if PRODUCTION:
-        # Schedule the daily reschedule job at 2am
-        cron_manager.schedule_reschedule_job()
+        if SCHEDULER_BACKEND == "inprocess":
+            # The in-process scheduler rolls over to the next day by itself
+            cron_manager.clear_all_jobs()
+            cron_manager.remove_job("reschedule")
+            prayer_scheduler.start()
+        else:
+            # Schedule the daily reschedule job at 2am
+            cron_manager.schedule_reschedule_job()
+        
+        if PLAY_IPC:
+            # play_adhan.py hands its play to this process when it can reach it
+            try:
+                PlayServer(chromecast_scanner, config_manager, UPLOAD_FOLDER, run_history=run_history).start()
+            except (OSError, RuntimeError) as e:
+                print(f"Play IPC socket not available: {e}")
         
         # Schedule prayers for today if mosque and chromecast are configured
         config = config_manager.load()
@@ -77,14 +125,15 @@ async def create_app():
         if mosque and mosque.get("uuid") and chromecast and chromecast.get("name"):
             print(f"Mosque and chromecast configured. Fetching prayer times for today...")
             try:
-                # Fetch prayer times for today
+                # Fetch prayer times for today (served from the stored calendar when fresh)
                 prayer_times_data = await mawaqit_client.get_prayer_times(mosque["uuid"])
                 if prayer_times_data:
                     from backend.utils import transform_prayer_times
-                    transformed_times = transform_prayer_times(prayer_times_data)
+                    calendar = mawaqit_client.calendar_store.get_calendar(mosque["uuid"])
+                    transformed_times = transform_prayer_times(prayer_times_data, calendar)
                     if transformed_times:
                         # Schedule prayers for today
-                        cron_manager.schedule_prayers(
+                        prayer_scheduler.schedule_prayers(
                             transformed_times,
                             chromecast["name"]
                         )
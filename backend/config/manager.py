@@ -2,7 +2,8 @@
 import copy
 import json
 import os
-from typing import Dict, Any, Optional
+import threading
+from typing import Dict, Any, List, Optional
 
 
 class ConfigManager:
@@ -20,6 +21,8 @@ class ConfigManager:
         self._default_config = self._get_default_config()
         self._cache: Optional[Dict[str, Any]] = None
         self._cache_mtime: Optional[float] = None
+        # Serializes writes; updates come from request threads and discovery callbacks
+        self._lock = threading.RLock()
     
     def _get_default_config(self) -> Dict[str, Any]:
         """Get default configuration structure"""
@@ -40,6 +43,8 @@ class ConfigManager:
                 "maghrib": None,
                 "isha": None
             },
+            # Per prayer, the devices (or cast groups) to play on together; defaults to "chromecast"
+            "chromecast_targets": {},
             "prayer_times": {},
             "prayer_schedule_date": None,
             "unsplash_access_key": None,
@@ -64,42 +69,80 @@ class ConfigManager:
 
     def save(self, config: Dict[str, Any]) -> bool:
         """Save configuration to JSON file and update in-memory cache."""
-        try:
-            os.makedirs(self.config_dir, exist_ok=True)
-            with open(self.config_file, "w") as f:
-                json.dump(config, f, indent=2)
-            self._cache = copy.deepcopy(config)
-            self._cache_mtime = os.path.getmtime(self.config_file)
-            return True
-        except (IOError, OSError) as e:
-            print(f"Error saving config: {e}")
-            return False
+        with self._lock:
+            try:
+                os.makedirs(self.config_dir, exist_ok=True)
+                with open(self.config_file, "w") as f:
+                    json.dump(config, f, indent=2)
+                self._cache = copy.deepcopy(config)
+                self._cache_mtime = os.path.getmtime(self.config_file)
+                return True
+            except (IOError, OSError) as e:
+                print(f"Error saving config: {e}")
+                return False
     
     def update(self, updates: Dict[str, Any]) -> Dict[str, Any]:
         """Update configuration with new values"""
-        config = self.load()
+        with self._lock:
+            config = self.load()
+        
+            if "mosque" in updates:
+                config["mosque"] = updates["mosque"]
         
-        if "mosque" in updates:
-            config["mosque"] = updates["mosque"]
+            if "chromecast" in updates:
+                config["chromecast"] = updates["chromecast"]
         
-        if "chromecast" in updates:
-            config["chromecast"] = updates["chromecast"]
+            if "chromecast_targets" in updates:
+                config.setdefault("chromecast_targets", {}).update(updates["chromecast_targets"])
         
-        if "adhan_files" in updates:
-            config["adhan_files"].update(updates["adhan_files"])
+            if "adhan_files" in updates:
+                config["adhan_files"].update(updates["adhan_files"])
         
-        if "adhan_volumes" in updates:
-            config["adhan_volumes"].update(updates["adhan_volumes"])
+            if "adhan_volumes" in updates:
+                config["adhan_volumes"].update(updates["adhan_volumes"])
         
-        if "prayer_times" in updates:
-            config["prayer_times"] = updates["prayer_times"]
+            if "prayer_times" in updates:
+                config["prayer_times"] = updates["prayer_times"]
         
-        if "prayer_schedule_date" in updates:
-            config["prayer_schedule_date"] = updates["prayer_schedule_date"]
+            if "prayer_schedule_date" in updates:
+                config["prayer_schedule_date"] = updates["prayer_schedule_date"]
 
-        if "unsplash_access_key" in updates:
-            config["unsplash_access_key"] = updates["unsplash_access_key"]
+            if "unsplash_access_key" in updates:
+                config["unsplash_access_key"] = updates["unsplash_access_key"]
 
-        self.save(config)
-        return config
+            self.save(config)
+            return config
 
+    def update_chromecast_address(self, name: str, uuid: str, host: str, port: int) -> bool:
+        """Store the current address of the selected chromecast; returns whether it changed.
+
+        The device is matched by its saved uuid, or by name when no uuid was saved yet.
+        """
+        with self._lock:
+            config = self.load()
+            device = config.get("chromecast")
+            if not device:
+                return False
+            if device.get("uuid"):
+                if device["uuid"] != uuid:
+                    return False
+            elif device.get("name") != name:
+                return False
+            address = {"host": host, "port": port, "uuid": uuid}
+            if all(device.get(key) == value for key, value in address.items()):
+                return False
+            device.update(address)
+            config["chromecast"] = device
+            self.save(config)
+            return True
+
+    def get_chromecast_targets(self, prayer_key: str, default_name: Optional[str] = None) -> List[str]:
+        """Get the names of the devices a prayer plays on (the configured chromecast if none are set)"""
+        config = self.load()
+        targets = (config.get("chromecast_targets") or {}).get(prayer_key) or []
+        if isinstance(targets, str):
+            targets = [targets]
+        if not targets:
+            default_name = default_name or (config.get("chromecast") or {}).get("name")
+            targets = [default_name] if default_name else []
+        return list(dict.fromkeys(targets))
@@ -1,11 +1,25 @@
-"""Route blueprints"""
-from .config import config_bp
-from .mosques import mosques_bp
-from .chromecasts import chromecasts_bp
-from .files import files_bp
-from .cron import cron_bp
-from .test import test_bp
-from .screensaver import screensaver_bp
+"""Route blueprints (imported on first use, see backend.utils.lazy_import)"""
+from typing import TYPE_CHECKING
 
-__all__ = ['config_bp', 'mosques_bp', 'chromecasts_bp', 'files_bp', 'cron_bp', 'test_bp', 'screensaver_bp']
+from backend.utils.lazy_import import lazy_exports
+
+if TYPE_CHECKING:
+    from .config import config_bp
+    from .mosques import mosques_bp
+    from .chromecasts import chromecasts_bp
+    from .files import files_bp
+    from .cron import cron_bp
+    from .test import test_bp
+    from .screensaver import screensaver_bp
 
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'config_bp': 'config',
+    'mosques_bp': 'mosques',
+    'chromecasts_bp': 'chromecasts',
+    'files_bp': 'files',
+    'cron_bp': 'cron',
+    'test_bp': 'test',
+    'screensaver_bp': 'screensaver',
+})
+
+__all__ = ['config_bp', 'mosques_bp', 'chromecasts_bp', 'files_bp', 'cron_bp', 'test_bp', 'screensaver_bp']
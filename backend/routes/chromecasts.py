@@ -1,5 +1,6 @@
 """Chromecast-related routes"""
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, request, jsonify
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -19,13 +20,69 @@ def init_scanner(scanner: 'ChromecastScanner'):
 
 @chromecasts_bp.route("/scan", methods=["GET"])
 def scan_chromecasts():
-    """Scan for Chromecast devices"""
+    """Scan for Chromecast devices (immediate when the discovery service is running).
+
+    Without the service, ?quiet=N ends the scan once no new device appeared for N seconds.
+    """
     try:
         timeout = int(request.args.get("timeout", 20))
         # Ensure minimum timeout of 10 seconds
         timeout = max(timeout, 10)
-        devices = chromecast_scanner.scan(timeout)
-        return jsonify({"devices": devices})
+        quiet_seconds = request.args.get("quiet", type=float)
+        devices = chromecast_scanner.scan(timeout, quiet_seconds=quiet_seconds)
+        return jsonify({"devices": devices, "discovery": chromecast_scanner.get_discovery_status()})
     except Exception as e:
         return jsonify({"error": str(e), "devices": []}), 500
 
+
+@chromecasts_bp.route("/scan/stream", methods=["GET"])
+def stream_scan_chromecasts():
+    """Scan for Chromecast devices as Server-Sent Events.
+
+    Sends a "device" event per device as soon as it is found, "progress" events about
+    every second and a final "summary" event. Query parameters: timeout (seconds,
+    default 10, at most 60) and quiet (stop once no new device appeared for this long).
+    """
+    timeout = min(max(request.args.get("timeout", default=10, type=float), 1), 60)
+    quiet_seconds = request.args.get("quiet", type=float)
+    scan_events = chromecast_scanner.stream_scan(timeout, quiet_seconds=quiet_seconds)
+
+    def events():
+        try:
+            for event, data in scan_events:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)})}\n\n"
+        finally:
+            scan_events.close()
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@chromecasts_bp.route("/status", methods=["GET"])
+def get_chromecast_status():
+    """Get the current status of a Chromecast (?name=, defaults to the configured one)"""
+    name = request.args.get("name")
+    if not name and chromecast_scanner.config_manager is not None:
+        name = (chromecast_scanner.config_manager.load().get("chromecast") or {}).get("name")
+    if not name:
+        return jsonify({"error": "No Chromecast given"}), 400
+    try:
+        status = chromecast_scanner.get_device_status(name)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if status is None:
+        return jsonify({"error": f"Chromecast '{name}' not reachable"}), 404
+    return jsonify(status)
+
+
+@chromecasts_bp.route("/pool", methods=["GET"])
+def get_pool_stats():
+    """Get the connection pool counters and open connections"""
+    stats = chromecast_scanner.get_pool_stats()
+    if stats is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **stats})
@@ -44,6 +44,9 @@ def update_config():
     if "chromecast" in data:
         updates["chromecast"] = data["chromecast"]
     
+    if "chromecast_targets" in data:
+        updates["chromecast_targets"] = data["chromecast_targets"]
+    
     if "adhan_files" in data:
         updates["adhan_files"] = data["adhan_files"]
     
@@ -54,8 +57,10 @@ def update_config():
         updates["unsplash_access_key"] = data["unsplash_access_key"]
 
     if "prayer_times" in data:
-        # Transform prayer times to simple string format if needed
-        updates["prayer_times"] = transform_prayer_times(data["prayer_times"])
+        # Transform prayer times to simple string format if needed; nothing usable keeps the stored times
+        prayer_times = transform_prayer_times(data["prayer_times"])
+        if prayer_times:
+            updates["prayer_times"] = prayer_times
     
     # Apply updates
     updated_config = config_manager.update(updates)
@@ -1,29 +1,103 @@
 """Cron job management routes"""
-from flask import Blueprint, jsonify
+import time
+from datetime import datetime, timedelta
+from flask import Blueprint, Response, jsonify, request
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from backend.services import CronManager
+    from backend.services import CronManager, RunHistory, RunLogArchive
 
 cron_bp = Blueprint('cron', __name__, url_prefix='/api/cron')
 
+# Seconds between keep-alive comments on an idle log stream
+LOG_STREAM_KEEPALIVE_SECONDS = 15
+
+# Log streams are closed after this long (the client reconnects if it still needs them)
+LOG_STREAM_TIMEOUT_SECONDS = 600
+
 # Initialize manager (will be injected)
 cron_manager = None
+run_history = None
+run_logs = None
 
 
-def init_manager(manager: 'CronManager'):
-    """Initialize cron manager for this blueprint"""
-    global cron_manager
+def init_manager(manager: 'CronManager', history: 'RunHistory' = None, logs: 'RunLogArchive' = None):
+    """Initialize cron manager (and run history and log archive) for this blueprint"""
+    global cron_manager, run_history, run_logs
     cron_manager = manager
+    run_history = history
+    run_logs = logs
 
 
 @cron_bp.route("/jobs", methods=["GET"])
 def get_cron_jobs():
-    """Get scheduled cron jobs"""
-    jobs = cron_manager.get_scheduled_jobs()
+    """Get scheduled cron jobs (pass ?upcoming=1 to include the jobs of the next days)"""
+    include_upcoming = request.args.get("upcoming", default=0, type=int) == 1
+    jobs = cron_manager.get_scheduled_jobs(include_upcoming=include_upcoming)
     return jsonify({"jobs": jobs})
 
 
+@cron_bp.route("/stats", methods=["GET"])
+def get_cron_stats():
+    """Get scheduler counters (e.g. crontab writes avoided)"""
+    return jsonify(cron_manager.get_stats())
+
+
+@cron_bp.route("/history", methods=["GET"])
+def get_cron_history():
+    """Get recent play attempts per prayer, with p50/p95/p99 lag from the planned time.
+
+    Query parameters: prayer (only this prayer), days (default 30), limit (runs per prayer, default 50)
+    """
+    if run_history is None:
+        return jsonify({"error": "Run history is not available"}), 404
+
+    prayer = request.args.get('prayer')
+    days = request.args.get('days', default=30, type=float)
+    limit = request.args.get('limit', default=50, type=int)
+    runs = run_history.get_runs(prayer=prayer, since=time.time() - days * 86400, limit=10000)
+
+    by_prayer = {}
+    for run in runs:
+        by_prayer.setdefault(run["prayer"], []).append(run)
+
+    return jsonify({
+        "history": {key: prayer_runs[:limit] for key, prayer_runs in by_prayer.items()},
+        "lag": {key: run_history.get_lag_stats(prayer_runs) for key, prayer_runs in by_prayer.items()},
+        "overall": run_history.get_lag_stats(runs),
+    })
+
+
+@cron_bp.route("/runs", methods=["GET"])
+def get_cron_runs():
+    """List archived job runs, newest first (from the archive index, no log is read).
+
+    Query parameters: prayer, from and to (YYYY-MM-DD, inclusive), outcome (played/failed), limit (default 100)
+    """
+    if run_logs is None:
+        return jsonify({"error": "Run log archive is not available"}), 404
+
+    try:
+        start = datetime.strptime(request.args["from"], "%Y-%m-%d").timestamp() if request.args.get("from") else None
+        end = (datetime.strptime(request.args["to"], "%Y-%m-%d") + timedelta(days=1)).timestamp() if request.args.get("to") else None
+    except ValueError:
+        return jsonify({"error": "from and to must be dates (YYYY-MM-DD)"}), 400
+    runs = run_logs.query(
+        prayer=request.args.get('prayer'), start=start, end=end,
+        outcome=request.args.get('outcome'), limit=request.args.get('limit', default=100, type=int),
+    )
+    return jsonify({"runs": runs})
+
+
+@cron_bp.route("/runs/<int:run_id>/logs", methods=["GET"])
+def get_cron_run_logs(run_id):
+    """Get the log of one archived run"""
+    logs = run_logs.read_run(run_id) if run_logs is not None else None
+    if logs is None:
+        return jsonify({"error": f"No logs found for run {run_id}"}), 404
+    return jsonify({"logs": logs, "run_id": run_id})
+
+
 @cron_bp.route("/jobs/<prayer>", methods=["DELETE"])
 def delete_cron_job(prayer):
     """Remove a specific cron job by prayer name"""
@@ -36,8 +110,6 @@ def delete_cron_job(prayer):
 @cron_bp.route("/jobs/<prayer>/logs", methods=["GET"])
 def get_cron_job_logs(prayer):
     """Get logs from the last run of a specific cron job"""
-    from flask import request
-    
     max_lines = request.args.get('max_lines', default=100, type=int)
     logs = cron_manager.get_job_logs(prayer, max_lines=max_lines)
     
@@ -46,3 +118,29 @@ def get_cron_job_logs(prayer):
     
     return jsonify({"logs": logs, "prayer": prayer})
 
+
+@cron_bp.route("/jobs/<prayer>/logs/stream", methods=["GET"])
+def stream_cron_job_logs(prayer):
+    """Stream a job's log as Server-Sent Events: the last lines, then new lines as they are written"""
+    max_lines = request.args.get('max_lines', default=100, type=int)
+    timeout = min(request.args.get('timeout', default=LOG_STREAM_TIMEOUT_SECONDS, type=float),
+                  LOG_STREAM_TIMEOUT_SECONDS)
+    lines = cron_manager.follow_job_logs(prayer, max_lines=max_lines, timeout=timeout)
+
+    def events():
+        last_sent = time.monotonic()
+        for line in lines:
+            if line is None:
+                if time.monotonic() - last_sent >= LOG_STREAM_KEEPALIVE_SECONDS:
+                    last_sent = time.monotonic()
+                    yield ": keep-alive\n\n"
+                continue
+            last_sent = time.monotonic()
+            text = line.rstrip("\r\n")
+            yield f"data: {text}\n\n"
+        yield "event: end\ndata: \n\n"
+
+    return Response(events(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
@@ -2,7 +2,8 @@
 from flask import Blueprint, request, jsonify
 from typing import TYPE_CHECKING
 from backend.utils import transform_prayer_times, get_prayer_schedule_date
-from datetime import datetime, timedelta
+from backend.utils.http_cache import ResponseCache
+from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
@@ -10,6 +11,7 @@ logger = logging.getLogger(__name__)
 if TYPE_CHECKING:
     from backend.services import MawaqitClient, CronManager
     from backend.config import ConfigManager
+    from backend.utils import PrayerCalendar
 
 mosques_bp = Blueprint('mosques', __name__, url_prefix='/api/mosques')
 
@@ -18,6 +20,9 @@ mawaqit_client = None
 config_manager = None
 cron_manager = None
 
+# Serialized /prayer-times/year payloads keyed by (mosque, year, calendar hash)
+_year_response_cache = ResponseCache()
+
 
 def init_services(mawaqit: 'MawaqitClient', cm: 'ConfigManager', cron_mgr: 'CronManager'):
     """Initialize services for this blueprint"""
@@ -34,7 +39,9 @@ async def search_mosques():
     if not query:
         return jsonify({"error": "Query parameter 'q' is required"}), 400
     
-    mosques = await mawaqit_client.search_mosques(query)
+    # Lets a newer query from the same client cancel its previous, still running search
+    client_id = request.headers.get("X-Client-Id") or request.remote_addr
+    mosques = await mawaqit_client.search_mosques(query, client_id=client_id)
     # Transform API response to match frontend Mosque type
     # API returns 'localisation' but frontend expects 'address'
     transformed_mosques = []
@@ -50,16 +57,28 @@ async def search_mosques():
     return jsonify({"mosques": transformed_mosques})
 
 
+@mosques_bp.route("/upstream-stats", methods=["GET"])
+def get_upstream_stats():
+    """Get Mawaqit API counters (handshakes, token refreshes, ...)"""
+    return jsonify(mawaqit_client.get_stats())
+
+
 @mosques_bp.route("/<mosque_id>/prayer-times", methods=["GET"])
 async def get_prayer_times(mosque_id):
-    """Get prayer times for a mosque"""
-    prayer_times = await mawaqit_client.get_prayer_times(mosque_id)
+    """Get prayer times for a mosque (pass ?refresh=1 to bypass the stored calendar)"""
+    refresh = request.args.get("refresh", "").lower() in ("1", "true", "yes")
+    prayer_times = await mawaqit_client.get_prayer_times(mosque_id, refresh=refresh)
     
     if prayer_times:
-        # Transform prayer times to simple string format
-        transformed_times = transform_prayer_times(prayer_times)
-
-        if "calendar" in prayer_times and prayer_times["calendar"]:
+        # Prefer the parsed calendar; fall back to the older payload formats
+        calendar = mawaqit_client.calendar_store.get_calendar(mosque_id)
+        transformed_times = transform_prayer_times(prayer_times, calendar)
+
+        if not transformed_times:
+            # Scheduling an empty dict would remove every prayer job
+            logger.warning("No prayer times for today in the response, keeping the current schedule")
+            return jsonify({"error": "No prayer times found for today"}), 500
+        if calendar:
             logger.info("Using calendar format - extracted: %s", transformed_times)
         else:
             logger.warning("Using fallback format - extracted: %s", transformed_times)
@@ -135,85 +154,66 @@ async def explore_calendar(mosque_id):
 
 @mosques_bp.route("/<mosque_id>/prayer-times/year", methods=["GET"])
 async def get_prayer_times_year(mosque_id):
-    """Get prayer times for the entire current year"""
-    from datetime import date
-    import calendar as cal_module
-    from backend.utils.date_utils import get_dst_periods, get_dst_transitions, format_date_both_calendars
-    
-    # Get current year
+    """Get prayer times for the entire current year.
+
+    The payload only depends on the mosque, the year and the calendar content, so
+    it is built once per (mosque, year, calendar hash) and served with an ETag.
+    """
     current_year = datetime.now().year
-    year_start = date(current_year, 1, 1)
     
     # Fetch prayer times for the year (API returns full calendar)
-    prayer_times = await mawaqit_client.get_prayer_times(mosque_id)
+    calendar = await mawaqit_client.get_prayer_calendar(mosque_id)
     
-    if not prayer_times or "calendar" not in prayer_times:
+    if not calendar:
         return jsonify({"error": "Failed to get prayer times calendar"}), 500
     
-    calendar_data = prayer_times["calendar"]
-    if not isinstance(calendar_data, list) or len(calendar_data) != 12:
-        return jsonify({"error": "Invalid calendar structure"}), 500
+    cached = _year_response_cache.get_or_build(
+        (mosque_id, current_year, calendar.content_hash),
+        lambda: _build_year_payload(calendar, current_year),
+    )
+    return cached.to_response()
+
+
+def _build_year_payload(calendar: 'PrayerCalendar', current_year: int) -> dict:
+    """Build the year view payload (daily times, DST flags, both calendar dates)"""
+    from datetime import date
+    from backend.utils.date_utils import get_dst_flags, get_dst_transitions, format_dates
+    from backend.utils.prayer_calendar import format_time
+    
+    year_start = date(current_year, 1, 1)
+    
+    # Days missing from the calendar are skipped
+    days = list(calendar.iter_days(year_start, date(current_year, 12, 31)))
     
-    # Get DST periods for the year
+    # Get DST status of every day and the transition dates for the year
     # Note: We don't have the mosque's timezone, so we'll use a default
     # The API times are already in local time (which includes DST adjustments)
-    dst_periods = get_dst_periods(current_year)
+    dst_flags = get_dst_flags([current_date for current_date, _ in days])
     dst_transitions = get_dst_transitions(current_year)
     
-    # Create a map of dates to DST status for quick lookup
-    # Note: periods should be non-overlapping and consecutive
-    # Each date should only be assigned once
-    date_to_dst = {}
-    for start_date, end_date, is_dst in dst_periods:
-        current = start_date
-        while current <= end_date and current.year == current_year:
-            if current in date_to_dst:
-                logger.warning("Date %s assigned DST=%s but already had %s", current, is_dst, date_to_dst[current])
-            date_to_dst[current] = is_dst
-            current += timedelta(days=1)
+    # Gregorian and Hijri labels of every day, from the per-year date table
+    date_formats_by_day = {entry["date"]: entry for entry in format_dates(year_start, date(current_year, 12, 31))}
     
     # Transform calendar to array of daily prayer times
     # Each entry: { dayOfYear: int, date: "YYYY-MM-DD", fajr: "HH:MM", dhuhr: "HH:MM", asr: "HH:MM", maghrib: "HH:MM", isha: "HH:MM", isDST: bool }
     year_data = []
-    day_of_year = 1
     
-    for month_idx, month_data in enumerate(calendar_data):
-        if not isinstance(month_data, dict):
-            continue
-        
-        month_num = month_idx + 1
-        # Get number of days in this month
-        days_in_month = cal_module.monthrange(current_year, month_num)[1]
+    for day_of_year, ((current_date, minutes), is_dst) in enumerate(zip(days, dst_flags), start=1):
+        # Map: [Fajr, Shuruq, Dhuhr, Asr, Maghrib, Isha]
+        date_formats = date_formats_by_day[current_date]
         
-        for day_num in range(1, days_in_month + 1):
-            day_key = str(day_num)
-            if day_key not in month_data:
-                continue
-            
-            day_times = month_data[day_key]
-            if not isinstance(day_times, list) or len(day_times) < 6:
-                continue
-            
-            # Map: [Fajr, Shuruq, Dhuhr, Asr, Maghrib, Isha]
-            current_date = date(current_year, month_num, day_num)
-            is_dst = date_to_dst.get(current_date, False)
-            
-            # Format date in both calendars
-            date_formats = format_date_both_calendars(current_date)
-            
-            year_data.append({
-                "dayOfYear": day_of_year,
-                "date": current_date.strftime("%Y-%m-%d"),
-                "fajr": day_times[0],
-                "dhuhr": day_times[2],
-                "asr": day_times[3],
-                "maghrib": day_times[4],
-                "isha": day_times[5],
-                "isDST": is_dst,
-                "gregorian": date_formats["gregorian"],
-                "hijri": date_formats["hijri"]
-            })
-            day_of_year += 1
+        year_data.append({
+            "dayOfYear": day_of_year,
+            "date": current_date.strftime("%Y-%m-%d"),
+            "fajr": format_time(minutes[0]),
+            "dhuhr": format_time(minutes[2]),
+            "asr": format_time(minutes[3]),
+            "maghrib": format_time(minutes[4]),
+            "isha": format_time(minutes[5]),
+            "isDST": is_dst,
+            "gregorian": date_formats["gregorian"],
+            "hijri": date_formats["hijri"]
+        })
     
     # Convert DST transitions to day of year for frontend
     dst_transition_days = []
@@ -224,9 +224,9 @@ async def get_prayer_times_year(mosque_id):
             "date": transition_date.strftime("%Y-%m-%d")
         })
     
-    return jsonify({
+    return {
         "year": current_year,
         "data": year_data,
         "dstTransitions": dst_transition_days
-    })
+    }
 
@@ -1,26 +1,51 @@
 """Test routes"""
 from flask import Blueprint, request, jsonify
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from backend.utils.network_utils import get_local_ip
 
 if TYPE_CHECKING:
-    from backend.services import ChromecastScanner
+    from backend.services import ChromecastScanner, JobRunner
+    from backend.services.job_runner import Job
 
 test_bp = Blueprint('test', __name__, url_prefix='/api/test')
 
-# Initialize scanner (will be injected)
+# Initialize scanner and job runner (will be injected)
 chromecast_scanner = None
+job_runner = None
 
 
-def init_scanner(scanner: 'ChromecastScanner'):
-    """Initialize scanner for this blueprint"""
-    global chromecast_scanner
+def init_scanner(scanner: 'ChromecastScanner', jobs: 'JobRunner'):
+    """Initialize scanner and job runner for this blueprint"""
+    global chromecast_scanner, job_runner
     chromecast_scanner = scanner
+    job_runner = jobs
+
+
+def _run_test_play(job: 'Job', chromecast_name: str, media_url: str, volume: Optional[float]):
+    """Job function: connect to the Chromecast and play the file"""
+    from backend.services.job_runner import JobCancelled
+
+    job.step = "connecting"
+    prepared = chromecast_scanner.prepare(chromecast_name, volume=volume)
+    if prepared is None:
+        raise RuntimeError(f"Chromecast '{chromecast_name}' not found")
+    if job.cancelled.is_set():
+        chromecast_scanner.release(prepared)
+        raise JobCancelled()
+
+    job.step = "playing"
+    played = chromecast_scanner.play_prepared(prepared, media_url, cancelled=job.cancelled)
+    job.check_cancelled()
+    if not played:
+        raise RuntimeError("Failed to play adhan")
+    return {"message": "Playing adhan", "timings": prepared.timings}
 
 
 @test_bp.route("/play", methods=["POST"])
 def test_play():
-    """Test playing adhan on Chromecast"""
+    """Start playing adhan on Chromecast; returns the job to poll at /api/test/jobs/<id>"""
+    from backend.services.job_runner import JobQueueFull
+
     data = request.json
     if data is None:
         return jsonify({"error": "Request body required"}), 400
@@ -37,9 +62,36 @@ def test_play():
     port = request.environ.get('SERVER_PORT', '3001')
     media_url = f"http://{local_ip}:{port}/api/files/{filename}"
     
-    success = chromecast_scanner.play_media(chromecast_name, media_url, volume=volume)
-    
-    if success:
-        return jsonify({"message": "Playing adhan"})
-    return jsonify({"error": "Failed to play adhan"}), 500
+    try:
+        job = job_runner.submit(
+            "test_play", _run_test_play,
+            params={"chromecast_name": chromecast_name, "filename": filename, "volume": volume},
+            chromecast_name=chromecast_name, media_url=media_url, volume=volume,
+        )
+    except JobQueueFull as e:
+        return jsonify({"error": f"Too many plays in progress, try again shortly ({e})"}), 429
+    return jsonify(job.to_dict()), 202
+
+
+@test_bp.route("/jobs", methods=["GET"])
+def get_jobs():
+    """List recent test jobs, newest first"""
+    return jsonify({"jobs": job_runner.get_jobs()})
+
+
+@test_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id: str):
+    """Get the state of a test job"""
+    job = job_runner.get_job(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job.to_dict())
+
 
+@test_bp.route("/jobs/<job_id>", methods=["DELETE"])
+def cancel_job(job_id: str):
+    """Cancel a queued or running test job (stops the media if it is starting)"""
+    job = job_runner.cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job.to_dict())
@@ -0,0 +1,28 @@
+"""Script to archive the log of a finished job run (appended to the cron jobs)"""
+import sys
+from pathlib import Path
+
+# Add parent directories to path to import backend modules
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.services.run_logs import RunLogArchive
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: python archive_run_log.py <prayer_key> <exit_code> <log_file>")
+        sys.exit(1)
+
+    prayer_key, exit_code, log_file = sys.argv[1], sys.argv[2], sys.argv[3]
+    try:
+        exit_code = int(exit_code)
+    except ValueError:
+        exit_code = None
+
+    run_id = RunLogArchive().add_log_file(prayer_key, log_file, exit_code)
+    if run_id is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
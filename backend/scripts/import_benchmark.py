@@ -0,0 +1,87 @@
+"""Measure the import time of the play entry point and fail if it exceeds a budget.
+
+Usage: python backend/scripts/import_benchmark.py [--budget-ms 500] [--runs 5] [--module backend.scripts.play_adhan]
+
+Each run imports the module in a fresh interpreter with `-X importtime`. The
+median cumulative time is compared with the budget (IMPORT_TIME_BUDGET_MS), and
+the run also fails if the module pulls in a dependency playback never needs.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+DEFAULT_MODULE = "backend.scripts.play_adhan"
+DEFAULT_BUDGET_MS = 500
+DEFAULT_RUNS = 5
+
+# Modules only the backend server needs; importing them from play_adhan is a regression
+FORBIDDEN_MODULES = ("mawaqit", "aiohttp", "crontab", "flask", "hijridate")
+
+
+def measure(module: str) -> Tuple[float, Dict[str, float]]:
+    """Import a module in a fresh interpreter; returns (total ms, cumulative ms per top-level import)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True,
+    )
+    total = 0.0
+    imports: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line.split("|")
+            cumulative_ms = int(cumulative) / 1000
+        except ValueError:
+            continue  # Header line
+        name = name.strip()
+        imports[name] = cumulative_ms
+        if name == module:
+            total = cumulative_ms
+    return total, imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--budget-ms", type=float,
+                        default=float(os.environ.get("IMPORT_TIME_BUDGET_MS", DEFAULT_BUDGET_MS)))
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args()
+
+    totals = []
+    imports: Dict[str, float] = {}
+    for _ in range(max(args.runs, 1)):
+        total, imports = measure(args.module)
+        totals.append(total)
+
+    median = statistics.median(totals)
+    print(f"{args.module}: median {median:.1f} ms over {len(totals)} runs "
+          f"(min {min(totals):.1f} ms, budget {args.budget_ms:.0f} ms)")
+
+    print("Slowest imports (last run):")
+    for name, cumulative_ms in sorted(imports.items(), key=lambda item: item[1], reverse=True)[1:11]:
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    failed = False
+    forbidden = sorted({name.split(".")[0] for name in imports} & set(FORBIDDEN_MODULES))
+    if forbidden:
+        print(f"FAIL: {args.module} imports {', '.join(forbidden)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: import time {median:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
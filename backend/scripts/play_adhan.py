@@ -1,24 +1,152 @@
 """Script to play adhan on Chromecast (called by cron jobs)"""
+import os
 import sys
 import json
+import time
+from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+PROCESS_STARTED_AT = time.time()
 
 # Add parent directories to path to import backend modules
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from backend.services import ChromecastScanner
 from backend.config import ConfigManager
-from backend.utils.network_utils import get_local_ip
+from backend.services.play_ipc import PlayIPCUnavailable, send_request
+from backend.utils.network_utils import get_media_url
+from backend.utils.prayer_calendar import parse_time
+
+
+# A date-specific job started this far from its prayer time is a leftover (e.g. from last year)
+MAX_DATE_DRIFT_SECONDS = 3600
+
+
+def _pop_option(args: list, name: str) -> Optional[str]:
+    """Remove `name value` from args and return the value ("" if it is missing)"""
+    if name not in args:
+        return None
+    index = args.index(name)
+    value = args[index + 1] if index + 1 < len(args) else ""
+    del args[index:index + 2]
+    return value
+
+
+def _get_target_time(at_time: Optional[str], target_date: Optional[str]) -> Optional[datetime]:
+    """Get the prayer time from --at/--date (cron may start us just before midnight)"""
+    now = datetime.now()
+    if target_date is not None:
+        day = datetime.strptime(target_date, "%Y-%m-%d").date()
+        if at_time is None:
+            return datetime.combine(day, now.time())
+        return datetime.combine(day, datetime.min.time()) + timedelta(minutes=parse_time(at_time))
+    if at_time is None:
+        return None
+    hour, minute = divmod(parse_time(at_time), 60)
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if (now - target).total_seconds() > 12 * 3600:
+        target += timedelta(days=1)
+    return target
+
+
+def _play_via_backend(chromecast_name: str, prayer_key: str, delay: float,
+                      scheduled_at: datetime) -> Optional[bool]:
+    """Ask the running backend to play; returns None if no backend is listening"""
+    request = {
+        "action": "play",
+        "chromecast_name": chromecast_name,
+        "prayer_key": prayer_key,
+        "delay": delay,
+        "scheduled_at": scheduled_at.timestamp(),
+        "process_started_at": PROCESS_STARTED_AT,
+    }
+    try:
+        # Connecting, waiting for the deadline and for playback to start all happen server side
+        response = send_request(request, timeout=delay + 120)
+    except PlayIPCUnavailable:
+        return None
+    except (OSError, ValueError) as e:
+        # The request may already be running in the backend: don't play it twice
+        print(f"Lost connection to the backend: {e}")
+        return False
+    
+    print(f"Played by the backend (id {response.get('id')}, state {response.get('state')})")
+    print(f"Timings: {response.get('timings')}")
+    if response.get("error"):
+        print(response["error"])
+    return bool(response.get("ok"))
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: python play_adhan.py <chromecast_name> <prayer_key>")
+    # First line of the log: RunLogArchive takes the run's start time from it
+    print(f"Run started at {datetime.fromtimestamp(PROCESS_STARTED_AT).isoformat(timespec='seconds')}")
+    args = sys.argv[1:]
+    at_time = _pop_option(args, "--at")
+    target_date = _pop_option(args, "--date")
+    standalone = "--standalone" in args
+    if standalone:
+        args.remove("--standalone")
+    
+    if len(args) < 2 or at_time == "" or target_date == "":
+        print("Usage: python play_adhan.py <chromecast_name> <prayer_key> [--at HH:MM] [--date YYYY-MM-DD] [--standalone]")
+        sys.exit(1)
+    
+    chromecast_name = args[0]
+    prayer_key = args[1]
+    
+    # When started ahead of the prayer, connect first and play at the given time
+    deadline = None
+    try:
+        target = _get_target_time(at_time, target_date)
+    except ValueError as e:
+        print(f"Invalid --at/--date value: {e}")
         sys.exit(1)
+    if target is not None:
+        remaining = (target - datetime.now()).total_seconds()
+        if target_date is not None and abs(remaining) > MAX_DATE_DRIFT_SECONDS:
+            print(f"Job is for {target.isoformat(timespec='minutes')}, not now. Skipping.")
+            sys.exit(0)
+        deadline = time.monotonic() + max(remaining, 0)
+    # Without --at the job fires on the prayer's minute
+    scheduled_at = target if at_time is not None else datetime.now().replace(second=0, microsecond=0)
+    
+    # Hand the play to the running backend, which keeps the Chromecast stack loaded
+    if not standalone and os.environ.get("PLAY_IPC", "1") != "0":
+        delay = max(deadline - time.monotonic(), 0) if deadline is not None else 0
+        result = _play_via_backend(chromecast_name, prayer_key, delay, scheduled_at)
+        if result is not None:
+            if result:
+                print(f"Successfully started playing {prayer_key} adhan on {chromecast_name}")
+            else:
+                print(f"Failed to play adhan on {chromecast_name}")
+            sys.exit(0 if result else 1)
+        print("Backend not reachable, playing standalone")
+    
+    error, devices = _play_standalone(chromecast_name, prayer_key, deadline)
+    if error:
+        print(error)
     
-    chromecast_name = sys.argv[1]
-    prayer_key = sys.argv[2]
+    # Record the attempt of each device (the backend records the plays it runs itself)
+    from backend.services.run_history import OUTCOME_FAILED, OUTCOME_PLAYED, RunHistory
+    run_history = RunHistory()
+    for name, result in (devices or {chromecast_name: {"played": False, "error": error, "timings": {}}}).items():
+        run_history.record(
+            prayer_key, "cron", OUTCOME_PLAYED if result["played"] else OUTCOME_FAILED,
+            chromecast_name=name, scheduled_at=scheduled_at,
+            process_started_at=PROCESS_STARTED_AT, timings=result["timings"], error=result["error"],
+        )
     
+    success = any(result["played"] for result in devices.values())
+    if success:
+        print(f"Successfully started playing {prayer_key} adhan on {chromecast_name}")
+    else:
+        print(f"Failed to play adhan on {chromecast_name}")
+        sys.exit(1)
+
+
+def _play_standalone(chromecast_name: str, prayer_key: str,
+                     deadline: Optional[float]) -> Tuple[Optional[str], Dict[str, Dict]]:
+    """Play in this process; returns (error message, results per device as from ChromecastScanner.play_group)"""
     # Load config
     config_manager = ConfigManager()
     config = config_manager.load()
@@ -27,8 +155,7 @@ def main():
     adhan_file = config.get("adhan_files", {}).get(prayer_key)
     
     if not adhan_file:
-        print(f"No adhan file configured for {prayer_key}")
-        sys.exit(1)
+        return f"No adhan file configured for {prayer_key}", {}
     
     # Get volume for this prayer (if set)
     volume = config.get("adhan_volumes", {}).get(prayer_key)
@@ -38,29 +165,48 @@ def main():
     adhan_path = project_root / "uploads" / Path(adhan_file).name
     
     if not adhan_path.exists():
-        print(f"Adhan file not found: {adhan_path}")
-        sys.exit(1)
+        return f"Adhan file not found: {adhan_path}", {}
     
     # Chromecast needs HTTP URL, not file path
-    # Get local IP and construct URL
-    local_ip = get_local_ip()
-    filename = Path(adhan_file).name
-    media_url = f"http://{local_ip}:3001/api/files/{filename}"
+    media_url = get_media_url(Path(adhan_file).name)
     
-    print(f"Attempting to play {prayer_key} adhan on {chromecast_name}")
+    targets = config_manager.get_chromecast_targets(prayer_key, chromecast_name)
+    if len(targets) == 1:
+        chromecast_name = targets[0]
+    print(f"Attempting to play {prayer_key} adhan on {', '.join(targets)}")
     print(f"Media URL: {media_url}")
     if volume is not None:
         print(f"Volume: {volume}")
     
-    # Try to play on Chromecast
-    scanner = ChromecastScanner()
-    success = scanner.play_media(chromecast_name, media_url, volume=volume)
+    # Connect and set the volume now, so only the play command is left at prayer time
+    from backend.services import ChromecastScanner
+    scanner = ChromecastScanner(config_manager=config_manager)
+    if len(targets) > 1:
+        group = scanner.prepare_group(targets, volume=volume)
+        print(f"Connected to {len(group.casts)}/{len(targets)} devices in {group.timings.get('warmup_seconds')}s")
+        results = scanner.play_group(group, media_url, deadline=deadline)
+        for name, result in results["devices"].items():
+            print(f"{name}: {'played' if result['played'] else result['error']} {result['timings']}")
+        print(f"Start skew: {results['start_skew_seconds']}s (commands: {results['command_skew_seconds']}s)")
+        failed = [name for name, result in results["devices"].items() if not result["played"]]
+        return (f"Failed on {', '.join(failed)}" if failed else None), results["devices"]
     
-    if success:
-        print(f"Successfully started playing {prayer_key} adhan on {chromecast_name}")
-    else:
-        print(f"Failed to play adhan on {chromecast_name}")
-        sys.exit(1)
+    prepared = scanner.prepare(chromecast_name, volume=volume)
+    if prepared is None:
+        error = f"Failed to connect to {chromecast_name}"
+        return error, {chromecast_name: {"played": False, "error": error, "timings": {}}}
+    print(f"Connected in {prepared.timings.get('warmup_seconds')}s ({prepared.timings.get('connect_path')})")
+    
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            print(f"Waiting {remaining:.1f}s")
+            time.sleep(remaining)
+    
+    success = scanner.play_prepared(prepared, media_url, deadline=deadline)
+    print(f"Timings: {prepared.timings}")
+    error = None if success else f"Failed to play adhan on {chromecast_name}"
+    return error, {chromecast_name: {"played": success, "error": error, "timings": prepared.timings}}
 
 
 if __name__ == "__main__":
@@ -2,6 +2,7 @@
 import sys
 import asyncio
 from pathlib import Path
+from datetime import datetime
 
 # Add parent directories to path to import backend modules
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
@@ -13,6 +14,7 @@ from backend.utils import transform_prayer_times, get_prayer_schedule_date
 
 async def main():
     """Reschedule prayers by fetching new times and updating cron jobs"""
+    print(f"Run started at {datetime.now().isoformat(timespec='seconds')}")
     print("Starting prayer reschedule at 2am...")
     
     # Load config
@@ -37,16 +39,30 @@ async def main():
     print(f"Fetching prayer times for mosque: {mosque.get('name', mosque_id)}")
     print(f"Chromecast: {chromecast_name}")
     
-    # Fetch prayer times from API
+    cron_manager = CronManager()
     mawaqit_client = MawaqitClient()
-    prayer_times_data = await mawaqit_client.get_prayer_times(mosque_id)
+    calendar_store = mawaqit_client.calendar_store
+    
+    # With multi-day scheduling the next days are already in the crontab, so a stale
+    # calendar is only refreshed opportunistically and a failed fetch is not fatal
+    calendar = calendar_store.get_calendar(mosque_id) if cron_manager.days_ahead > 1 else None
+    prayer_times_data = None
+    if calendar is None or not calendar_store.is_fresh(calendar_store.get_entry(mosque_id)):
+        # Fetch prayer times (served from the stored calendar unless it is stale)
+        try:
+            prayer_times_data = await mawaqit_client.get_prayer_times(mosque_id)
+        except Exception as e:
+            print(f"Error fetching prayer times: {e}")
+        calendar = calendar_store.get_calendar(mosque_id) or calendar
+    else:
+        print(f"Topping up {cron_manager.days_ahead} days from the stored calendar")
     
-    if not prayer_times_data:
+    if not calendar and not prayer_times_data:
         print("Failed to fetch prayer times from API. Skipping reschedule.")
         sys.exit(1)
     
     # Transform prayer times to simple format
-    transformed_times = transform_prayer_times(prayer_times_data)
+    transformed_times = transform_prayer_times(prayer_times_data, calendar)
     
     if not transformed_times:
         print("No prayer times extracted. Skipping reschedule.")
@@ -64,7 +80,6 @@ async def main():
     })
     
     # Schedule new cron jobs
-    cron_manager = CronManager()
     success = cron_manager.schedule_prayers(transformed_times, chromecast_name)
     
     if success:
@@ -1,8 +1,39 @@
-"""Service modules"""
-from .chromecast_scanner import ChromecastScanner
-from .cron_manager import CronManager
-from .mawaqit_client import MawaqitClient
-from .unsplash_client import UnsplashClient
+"""Service modules (imported on first use, see backend.utils.lazy_import)"""
+from typing import TYPE_CHECKING
 
-__all__ = ['ChromecastScanner', 'CronManager', 'MawaqitClient', 'UnsplashClient']
+from backend.utils.lazy_import import lazy_exports
 
+if TYPE_CHECKING:
+    from .calendar_store import CalendarStore
+    from .cast_pool import CastConnectionPool
+    from .chromecast_scanner import ChromecastScanner
+    from .cron_manager import CronManager
+    from .discovery_service import DiscoveryService
+    from .job_runner import JobRunner
+    from .mawaqit_client import MawaqitClient
+    from .mawaqit_pool import MawaqitSessionPool
+    from .mosque_index import MosqueIndex
+    from .play_ipc import PlayServer
+    from .prayer_scheduler import PrayerScheduler
+    from .run_history import RunHistory
+    from .run_logs import RunLogArchive
+    from .unsplash_client import UnsplashClient
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'CalendarStore': 'calendar_store',
+    'CastConnectionPool': 'cast_pool',
+    'ChromecastScanner': 'chromecast_scanner',
+    'CronManager': 'cron_manager',
+    'DiscoveryService': 'discovery_service',
+    'JobRunner': 'job_runner',
+    'MawaqitClient': 'mawaqit_client',
+    'MawaqitSessionPool': 'mawaqit_pool',
+    'MosqueIndex': 'mosque_index',
+    'PlayServer': 'play_ipc',
+    'PrayerScheduler': 'prayer_scheduler',
+    'RunHistory': 'run_history',
+    'RunLogArchive': 'run_logs',
+    'UnsplashClient': 'unsplash_client',
+})
+
+__all__ = ['CalendarStore', 'CastConnectionPool', 'ChromecastScanner', 'CronManager', 'DiscoveryService', 'JobRunner', 'MawaqitClient', 'MawaqitSessionPool', 'MosqueIndex', 'PlayServer', 'PrayerScheduler', 'RunHistory', 'RunLogArchive', 'UnsplashClient']
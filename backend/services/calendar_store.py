@@ -0,0 +1,206 @@
+"""Persistent per-mosque storage of Mawaqit prayer calendars"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from backend.config import ConfigManager
+from backend.utils.prayer_calendar import PrayerCalendar, PrayerCalendarError
+
+logger = logging.getLogger(__name__)
+
+# Bump when the on-disk entry layout changes; older entries are treated as stale
+CALENDAR_STORE_VERSION = 1
+
+# Calendars are published for the whole year and rarely change, a week is plenty
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class CalendarStore:
+    """Stores the raw Mawaqit prayer-times payload of each mosque under CONFIG_DIR.
+
+    Each mosque gets its own JSON file holding the payload together with the
+    store version, the fetch timestamp and a SHA-256 hash of the content.
+    Reads are served from an in-memory copy keyed by the file's mtime, so they
+    only cost a stat() once the entry has been loaded. The parsed PrayerCalendar
+    of each entry is kept next to it as a memory-mappable binary file.
+    """
+
+    def __init__(self, config_dir: str = None, ttl: Optional[int] = None):
+        if config_dir is None:
+            config_dir = ConfigManager().config_dir
+        if ttl is None:
+            ttl = int(os.environ.get("CALENDAR_TTL", DEFAULT_TTL_SECONDS))
+
+        self.store_dir = os.path.join(config_dir, "calendars")
+        self.ttl = ttl
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._calendars: Dict[str, PrayerCalendar] = {}
+        self._lock = threading.Lock()
+
+    def _get_entry_path(self, mosque_id: str) -> str:
+        """Get the file path of a mosque's entry (mosque ids are UUIDs, but never trust input)"""
+        safe_id = re.sub(r"[^A-Za-z0-9_-]", "_", str(mosque_id))
+        return os.path.join(self.store_dir, f"{safe_id}.json")
+
+    def _get_calendar_path(self, mosque_id: str) -> str:
+        """Get the path of a mosque's binary PrayerCalendar file"""
+        return f"{os.path.splitext(self._get_entry_path(mosque_id))[0]}.bin"
+
+    @staticmethod
+    def compute_hash(data: Any) -> str:
+        """Hash a payload independently of its key order"""
+        canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get_entry(self, mosque_id: str) -> Optional[Dict[str, Any]]:
+        """Get the stored entry of a mosque, or None if there is none.
+
+        The returned entry is shared with the in-memory cache and must not be mutated.
+        """
+        path = self._get_entry_path(mosque_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._cache.get(mosque_id)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading stored calendar for {mosque_id}: {e}")
+            return None
+
+        if not isinstance(entry, dict) or entry.get("version") != CALENDAR_STORE_VERSION:
+            return None
+
+        with self._lock:
+            self._cache[mosque_id] = (mtime, entry)
+        return entry
+
+    def is_fresh(self, entry: Optional[Dict[str, Any]], now: Optional[float] = None) -> bool:
+        """Check whether an entry can be used without refetching it.
+
+        An entry is stale once it is older than the TTL, or when it was fetched
+        in a previous year (the calendar only covers the year it was published for).
+        """
+        if not entry or entry.get("version") != CALENDAR_STORE_VERSION:
+            return False
+        if now is None:
+            now = time.time()
+
+        fetched_at = entry.get("fetched_at", 0)
+        if now - fetched_at > self.ttl:
+            return False
+        return datetime.fromtimestamp(fetched_at).year == datetime.fromtimestamp(now).year
+
+    def get(self, mosque_id: str, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """Get the stored payload of a mosque if it is fresh (or any stored payload if allow_stale)"""
+        entry = self.get_entry(mosque_id)
+        if entry and (allow_stale or self.is_fresh(entry)):
+            return entry["data"]
+        return None
+
+    def get_hash(self, mosque_id: str) -> Optional[str]:
+        """Get the content hash of a mosque's stored payload"""
+        entry = self.get_entry(mosque_id)
+        return entry.get("hash") if entry else None
+
+    def get_calendar(self, mosque_id: str) -> Optional[PrayerCalendar]:
+        """Get the parsed calendar of a mosque's stored payload (regardless of freshness).
+
+        Uses, in order: the in-memory calendar, the memory-mapped binary file, and
+        finally parses the stored payload (writing the binary file for next time).
+        Returns None when nothing is stored or the payload has no valid calendar.
+        """
+        entry = self.get_entry(mosque_id)
+        if not entry:
+            return None
+
+        calendar = self._calendars.get(mosque_id)
+        if calendar is not None and calendar.content_hash == entry["hash"]:
+            return calendar
+
+        calendar_path = self._get_calendar_path(mosque_id)
+        try:
+            calendar = PrayerCalendar.load(calendar_path)
+            if calendar.content_hash != entry["hash"]:
+                calendar = None
+        except (OSError, ValueError):
+            calendar = None
+
+        if calendar is None:
+            try:
+                calendar = PrayerCalendar.from_payload(entry["data"], entry["hash"])
+            except PrayerCalendarError as e:
+                logger.warning(f"Invalid calendar for mosque {mosque_id}: {e}")
+                return None
+            if calendar is None:
+                return None
+            try:
+                calendar.save(calendar_path)
+            except OSError as e:
+                logger.warning(f"Error writing binary calendar for {mosque_id}: {e}")
+
+        with self._lock:
+            self._calendars[mosque_id] = calendar
+        return calendar
+
+    def put(self, mosque_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Store a freshly fetched payload and return the new entry.
+
+        The file is written atomically. When the content hash did not change,
+        only the fetch timestamp is refreshed and `changed_at` is kept.
+        """
+        now = time.time()
+        content_hash = self.compute_hash(data)
+        previous = self.get_entry(mosque_id)
+        changed_at = now
+        if previous and previous.get("hash") == content_hash:
+            changed_at = previous.get("changed_at", now)
+
+        entry = {
+            "version": CALENDAR_STORE_VERSION,
+            "mosque_id": mosque_id,
+            "fetched_at": now,
+            "changed_at": changed_at,
+            "hash": content_hash,
+            "data": data,
+        }
+
+        path = self._get_entry_path(mosque_id)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._cache[mosque_id] = (os.path.getmtime(path), entry)
+        except (IOError, OSError) as e:
+            logger.error(f"Error storing calendar for {mosque_id}: {e}")
+        return entry
+
+    def invalidate(self, mosque_id: str) -> bool:
+        """Remove a mosque's stored entry so that the next read refetches it"""
+        with self._lock:
+            self._cache.pop(mosque_id, None)
+            self._calendars.pop(mosque_id, None)
+        try:
+            os.remove(self._get_calendar_path(mosque_id))
+        except OSError:
+            pass
+        try:
+            os.remove(self._get_entry_path(mosque_id))
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,283 @@
+"""Pool of persistent Chromecast connections (backend only)"""
+import os
+import threading
+import time
+import logging
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, Optional, Tuple
+
+import pychromecast
+
+if TYPE_CHECKING:
+    from backend.services.discovery_service import DiscoveryService
+
+logger = logging.getLogger(__name__)
+
+# Connections unused for this long are closed
+DEFAULT_IDLE_SECONDS = 900
+
+# How often connections are checked (and broken ones reconnected)
+DEFAULT_HEALTH_CHECK_SECONDS = 30
+
+# Reconnect attempts after a failure wait BACKOFF_BASE * 2^(failures - 1) seconds, up to BACKOFF_MAX
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 300
+
+# Connect latencies kept for the stats
+LATENCY_SAMPLES = 100
+
+CONNECT_PATH_POOL = "pool"
+
+Connection = Tuple[pychromecast.Chromecast, Optional["DiscoveryService"], Dict]
+
+
+class _PooledCast:
+    def __init__(self, name: str, chromecast: pychromecast.Chromecast, discovery: Optional["DiscoveryService"]):
+        self.name = name
+        self.chromecast = chromecast
+        # One-off discovery the device was found with, stopped when the connection is closed
+        self.discovery = discovery
+        self.connected_at = time.monotonic()
+        self.last_used = self.connected_at
+        self.in_use = 0
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def is_healthy(self) -> bool:
+        socket_client = getattr(self.chromecast, "socket_client", None)
+        return bool(socket_client is not None and socket_client.is_connected and self.chromecast.status is not None)
+
+
+class CastConnectionPool:
+    """Keeps Chromecast connections open between plays, keyed by device uuid.
+
+    `connect(name)` opens a new connection and returns (chromecast, one-off
+    discovery or None, timings), as ChromecastScanner.connect does. A background
+    thread pings the connections every `health_check_seconds`, reconnects broken
+    ones with exponential backoff and closes the ones idle for `idle_seconds`.
+    """
+
+    def __init__(self, connect: Callable[[str], Optional[Connection]], idle_seconds: Optional[float] = None,
+                 health_check_seconds: Optional[float] = None):
+        if idle_seconds is None:
+            idle_seconds = float(os.environ.get("CAST_POOL_IDLE_SECONDS", DEFAULT_IDLE_SECONDS))
+        if health_check_seconds is None:
+            health_check_seconds = float(os.environ.get("CAST_POOL_HEALTH_CHECK_SECONDS", DEFAULT_HEALTH_CHECK_SECONDS))
+        self._connect = connect
+        self.idle_seconds = idle_seconds
+        self.health_check_seconds = health_check_seconds
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, _PooledCast] = {}
+        self._uuids_by_name: Dict[str, str] = {}
+        # Connecting to the same device twice at once would leave one connection behind
+        self._connect_locks: Dict[str, threading.Lock] = {}
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.stats = {"connects": 0, "connect_failures": 0, "reuses": 0, "reconnects": 0, "evictions": 0}
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def start(self):
+        """Start the health check thread (idempotent)"""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="cast-pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the health checks and close every connection"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._uuids_by_name.clear()
+        for entry in entries:
+            self._close(entry)
+
+    def _get_entry(self, name: str) -> Optional[_PooledCast]:
+        with self._lock:
+            uuid = self._uuids_by_name.get(name)
+            return self._entries.get(uuid) if uuid else None
+
+    def acquire(self, name: str) -> Optional[Connection]:
+        """Get a connected Chromecast by name, reusing the pooled connection when it is healthy.
+
+        Returns (chromecast, None, timings) like ChromecastScanner.connect, None if the
+        device cannot be reached. Hand it back with release().
+        """
+        with self._lock:
+            connect_lock = self._connect_locks.setdefault(name, threading.Lock())
+        with connect_lock:
+            entry = self._get_entry(name)
+            if entry is not None and entry.is_healthy():
+                with self._lock:
+                    entry.in_use += 1
+                    entry.last_used = time.monotonic()
+                    self.stats["reuses"] += 1
+                return entry.chromecast, None, {"connect_path": CONNECT_PATH_POOL, "discovery_seconds": 0.0,
+                                                "connect_seconds": 0.0}
+            if entry is not None:
+                self._remove(entry)
+                self._close(entry)
+
+            connection = self._open(name)
+            if connection is None:
+                return None
+            entry, timings = connection
+            with self._lock:
+                entry.in_use += 1
+            return entry.chromecast, None, timings
+
+    def release(self, chromecast: pychromecast.Chromecast):
+        """Hand back a Chromecast from acquire(); the connection stays open"""
+        with self._lock:
+            entry = self._entries.get(str(chromecast.uuid))
+            if entry is not None and entry.chromecast is chromecast:
+                entry.in_use = max(entry.in_use - 1, 0)
+                entry.last_used = time.monotonic()
+                return
+        # Replaced by a reconnect while it was in use
+        try:
+            chromecast.disconnect(timeout=1)
+        except Exception:
+            pass
+
+    def _open(self, name: str) -> Optional[Tuple[_PooledCast, Dict]]:
+        started = time.monotonic()
+        connection = self._connect(name)
+        latency = time.monotonic() - started
+        with self._lock:
+            if connection is None:
+                self.stats["connect_failures"] += 1
+                return None
+            chromecast, discovery, timings = connection
+            entry = _PooledCast(name, chromecast, discovery)
+            uuid = str(chromecast.uuid)
+            previous = self._entries.get(uuid)
+            self._entries[uuid] = entry
+            self._uuids_by_name[name] = uuid
+            self.stats["connects"] += 1
+            self._latencies.append(latency)
+        if previous is not None and previous.in_use == 0:
+            self._close(previous)
+        logger.info(f"Pooled connection to {name} opened in {latency:.3f}s")
+        return entry, timings
+
+    def _remove(self, entry: _PooledCast):
+        with self._lock:
+            uuid = str(entry.chromecast.uuid)
+            if self._entries.get(uuid) is entry:
+                del self._entries[uuid]
+                if self._uuids_by_name.get(entry.name) == uuid:
+                    del self._uuids_by_name[entry.name]
+
+    @staticmethod
+    def _close(entry: _PooledCast):
+        try:
+            entry.chromecast.disconnect(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error disconnecting from {entry.name}: {e}")
+        if entry.discovery is not None:
+            entry.discovery.stop()
+
+    def _run(self):
+        """Health check thread"""
+        while not self._stopped.wait(self.health_check_seconds):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error checking pooled connections: {e}", exc_info=True)
+
+    def check(self):
+        """Close idle connections, ping the others and reconnect the broken ones (with backoff)"""
+        now = time.monotonic()
+        with self._lock:
+            entries = list(self._entries.values())
+
+        for entry in entries:
+            if entry.in_use == 0 and now - entry.last_used > self.idle_seconds:
+                self._evict(entry)
+                continue
+
+            if entry.is_healthy():
+                try:
+                    # Heartbeat: ask for the receiver status; a dead socket fails here
+                    entry.chromecast.socket_client.receiver_controller.update_status()
+                    entry.failures = 0
+                    continue
+                except Exception as e:
+                    logger.info(f"Health check of {entry.name} failed: {e}")
+
+            if now < entry.retry_at or entry.in_use:
+                continue
+            self._reconnect(entry)
+
+    def _evict(self, entry: _PooledCast):
+        with self._lock:
+            connect_lock = self._connect_locks.setdefault(entry.name, threading.Lock())
+        if not connect_lock.acquire(blocking=False):
+            return  # A play is acquiring it right now
+        try:
+            with self._lock:
+                # It may have been handed out between the idle check and taking the lock
+                if entry.in_use or time.monotonic() - entry.last_used <= self.idle_seconds:
+                    return
+            logger.info(f"Closing idle connection to {entry.name}")
+            self._remove(entry)
+            self._close(entry)
+            with self._lock:
+                self.stats["evictions"] += 1
+        finally:
+            connect_lock.release()
+
+    def _reconnect(self, entry: _PooledCast):
+        with self._lock:
+            connect_lock = self._connect_locks.setdefault(entry.name, threading.Lock())
+        if not connect_lock.acquire(blocking=False):
+            return  # A play is connecting to it right now
+        try:
+            self._remove(entry)
+            self._close(entry)
+            with self._lock:
+                self.stats["reconnects"] += 1
+            connection = self._open(entry.name)
+            if connection is None:
+                # Keep the broken entry around so the next attempt is delayed
+                entry.failures += 1
+                entry.retry_at = time.monotonic() + min(BACKOFF_BASE_SECONDS * 2 ** (entry.failures - 1), BACKOFF_MAX_SECONDS)
+                with self._lock:
+                    self._entries.setdefault(str(entry.chromecast.uuid), entry)
+                    self._uuids_by_name.setdefault(entry.name, str(entry.chromecast.uuid))
+                logger.info(f"Reconnecting to {entry.name} failed, next attempt in "
+                            f"{entry.retry_at - time.monotonic():.0f}s")
+        finally:
+            connect_lock.release()
+
+    def get_stats(self) -> Dict:
+        """Connection counters, connect latency and the state of each pooled connection"""
+        now = time.monotonic()
+        with self._lock:
+            last_latency = self._latencies[-1] if self._latencies else None
+            latencies = sorted(self._latencies)
+            entries = list(self._entries.values())
+            stats = dict(self.stats)
+        stats["connect_latency_seconds"] = {
+            "last": round(last_latency, 3) if latencies else None,
+            "mean": round(sum(latencies) / len(latencies), 3) if latencies else None,
+            "max": round(latencies[-1], 3) if latencies else None,
+        }
+        stats["connections"] = [{
+            "name": entry.name,
+            "uuid": str(entry.chromecast.uuid),
+            "healthy": entry.is_healthy(),
+            "in_use": entry.in_use,
+            "connected_seconds": round(now - entry.connected_at, 1),
+            "idle_seconds": round(now - entry.last_used, 1),
+            "failures": entry.failures,
+        } for entry in entries]
+        return stats
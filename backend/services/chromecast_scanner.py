@@ -1,78 +1,127 @@
 """Chromecast discovery and control"""
 import pychromecast
-from pychromecast.discovery import CastBrowser, SimpleCastListener
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from pychromecast import dial
+from pychromecast.models import CastInfo, HostServiceInfo
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+from uuid import UUID
+import os
+import threading
 import time
 import logging
-import zeroconf as zeroconf_module
+
+from backend.services.discovery_service import DiscoveryService
+
+if TYPE_CHECKING:
+    from backend.config import ConfigManager
+    from backend.services.cast_pool import CastConnectionPool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DEFAULT_CAST_PORT = 8009
+
+# How long a direct connection to the last known address may take before falling back to discovery
+DEFAULT_DIRECT_CONNECT_TIMEOUT_SECONDS = 3
+
+# Devices of a group are prepared and played with at most this many threads
+DEFAULT_MAX_PLAY_WORKERS = 8
+
+# Time given to the play threads of a group to start before the shared start time
+GROUP_START_LEAD_SECONDS = 0.05
+
+# How the device was reached, reported as timings["connect_path"]
+CONNECT_PATH_DIRECT = "direct"
+CONNECT_PATH_REGISTRY = "registry"
+CONNECT_PATH_MDNS = "mdns"
+
 
 class ChromecastScanner:
-    def __init__(self):
-        self.chromecasts = []
-        self.browser = None
+    def __init__(self, discovery: Optional[DiscoveryService] = None,
+                 config_manager: Optional["ConfigManager"] = None):
+        """`discovery` is a running DiscoveryService to use instead of a one-off browse per call.
+
+        With a `config_manager`, the configured device is first connected to directly at
+        its last known host/port, which is kept up to date from discovery. Set `pool`
+        to a CastConnectionPool built on connect() to keep connections open between plays.
+        """
+        self.discovery = discovery
+        self.config_manager = config_manager
+        self.pool: Optional["CastConnectionPool"] = None
+        self.max_play_workers = max(int(os.environ.get("MAX_PLAY_WORKERS", DEFAULT_MAX_PLAY_WORKERS)), 1)
+        self.direct_connect_timeout = float(
+            os.environ.get("DIRECT_CONNECT_TIMEOUT_SECONDS", DEFAULT_DIRECT_CONNECT_TIMEOUT_SECONDS)
+        )
+        # Scans without an explicit quiet_seconds end this long after the last new device
+        scan_quiet_seconds = os.environ.get("SCAN_QUIET_SECONDS")
+        self.scan_quiet_seconds = float(scan_quiet_seconds) if scan_quiet_seconds else None
+        if discovery is not None and config_manager is not None:
+            discovery.add_listener(self._remember_device)
+
+    def _has_discovery(self) -> bool:
+        return self.discovery is not None and self.discovery.is_running()
+
+    def get_discovery_status(self) -> Optional[Dict]:
+        """Describe the discovery service's registry (None without a running service)"""
+        return self.discovery.get_status() if self._has_discovery() else None
 
-    def _discover(self, timeout: int = 10) -> Tuple[CastBrowser, List]:
-        """Discover Chromecast devices using CastBrowser. Returns (browser, chromecasts).
+    def get_pool_stats(self) -> Optional[Dict]:
+        """Connection pool counters and connections (None without a pool)"""
+        return self.pool.get_stats() if self.pool is not None else None
 
-        A Zeroconf instance must be passed to CastBrowser — without it,
-        start_discovery() skips the mDNS ServiceBrowser and finds nothing.
+    def get_device_status(self, chromecast_name: str) -> Optional[Dict]:
+        """Current status of a Chromecast (through the pool when there is one); None if unreachable"""
+        prepared = self.prepare(chromecast_name)
+        if prepared is None:
+            return None
+        try:
+            chromecast = prepared.chromecast
+            status = chromecast.status
+            return {
+                "name": chromecast_name,
+                "uuid": str(chromecast.uuid),
+                "app": chromecast.app_display_name,
+                "is_idle": chromecast.is_idle,
+                "volume": round(status.volume_level, 2) if status else None,
+                "muted": status.volume_muted if status else None,
+                "connect_path": prepared.timings.get("connect_path"),
+                "connect_seconds": prepared.timings.get("warmup_seconds"),
+            }
+        finally:
+            self.release(prepared)
+
+    def _discover(self, timeout: float = 10, quiet_seconds: Optional[float] = None) -> DiscoveryService:
+        """Browse with a temporary DiscoveryService; the caller stops it.
+
+        Returns once no new device appeared for `quiet_seconds` (if given), or after
+        `timeout` seconds.
         """
-        zconf = zeroconf_module.Zeroconf()
-        browser = CastBrowser(SimpleCastListener(), zconf)
-        browser.start_discovery()
-        time.sleep(timeout)
+        discovery = DiscoveryService()
+        discovery.start()
+        discovery.wait_for_quiet(quiet_seconds if quiet_seconds is not None else timeout, timeout)
+        return discovery
 
-        chromecasts = []
-        for cast_info in list(browser.devices.values()):
-            try:
-                cc = pychromecast.get_chromecast_from_cast_info(cast_info, zconf)
-                if cc:
-                    chromecasts.append(cc)
-            except Exception as e:
-                logger.warning(f"Error getting Chromecast from cast_info: {e}")
+    def scan(self, timeout: int = 10, quiet_seconds: Optional[float] = None) -> List[Dict]:
+        """Scan for Chromecast devices on the network.
 
-        return browser, chromecasts
+        With a running discovery service this returns its registry immediately.
+        Otherwise browses for up to `timeout` seconds, or until no new device
+        appeared for `quiet_seconds`.
+        """
+        if self._has_discovery():
+            return self.discovery.get_devices()
 
-    def scan(self, timeout: int = 10) -> List[Dict]:
-        """Scan for Chromecast devices on the network"""
         actual_timeout = max(timeout, 10)
-        browser = None
+        if quiet_seconds is None:
+            quiet_seconds = self.scan_quiet_seconds
+        discovery = None
         try:
             logger.info(f"Starting Chromecast discovery with timeout={actual_timeout} seconds...")
-            browser, chromecasts = self._discover(actual_timeout)
-            logger.info(f"Discovery completed. Found {len(chromecasts)} Chromecast device(s)")
-
-            devices = []
-            for cc in chromecasts:
-                try:
-                    device_info = {
-                        "name": cc.name,
-                        "uuid": cc.uuid,
-                        "model_name": cc.model_name,
-                        "cast_type": cc.cast_type,
-                        "host": str(cc.socket_client.host) if hasattr(cc, "socket_client") and hasattr(cc.socket_client, "host") else None,
-                    }
-                    devices.append(device_info)
-                    logger.info(f"Found device: {device_info['name']} ({device_info['model_name']})")
-                except Exception as e:
-                    logger.warning(f"Error getting details for Chromecast: {e}")
-                    try:
-                        if hasattr(cc, "cast_info") and cc.cast_info:
-                            devices.append({
-                                "name": getattr(cc.cast_info, "friendly_name", "Unknown"),
-                                "uuid": getattr(cc.cast_info, "uuid", ""),
-                                "model_name": getattr(cc.cast_info, "model_name", "Unknown"),
-                                "cast_type": getattr(cc.cast_info, "cast_type", "cast"),
-                                "host": None,
-                            })
-                    except Exception as e2:
-                        logger.error(f"Could not extract any info from Chromecast: {e2}")
-
-            self.chromecasts = chromecasts
+            started = time.monotonic()
+            discovery = self._discover(actual_timeout, quiet_seconds)
+            devices = discovery.get_devices()
+            logger.info(f"Discovery completed after {time.monotonic() - started:.1f}s. "
+                        f"Found {len(devices)} Chromecast device(s)")
 
             if not devices:
                 logger.warning("No Chromecast devices found. Troubleshooting tips:")
@@ -90,64 +139,381 @@ class ChromecastScanner:
             logger.error(f"Unexpected error scanning for Chromecasts: {e}", exc_info=True)
             return []
         finally:
-            if browser:
-                try:
-                    browser.stop_discovery()
-                except Exception as e:
-                    logger.warning(f"Error stopping discovery: {e}")
+            self._stop_discovery(discovery)
 
-    def play_media(self, chromecast_name: str, media_url: str, volume: Optional[float] = None) -> bool:
-        """Play media on a specific Chromecast"""
-        browser = None
+    def stream_scan(self, timeout: float = 10, quiet_seconds: Optional[float] = None,
+                    heartbeat_seconds: float = 1.0) -> Iterator[Tuple[str, Dict]]:
+        """Scan and yield (event, data) as devices are found.
+
+        Events: "device" (a device dict, as returned by scan) for each device as soon
+        as it is known, "progress" (elapsed seconds and devices so far) at least every
+        `heartbeat_seconds`, and a final "summary" with all devices. Known devices of a
+        running discovery service are sent at once; the scan then keeps listening for
+        new ones until `timeout`, or until none appeared for `quiet_seconds`.
+        """
+        if quiet_seconds is None:
+            quiet_seconds = self.scan_quiet_seconds
+        discovery = self.discovery if self._has_discovery() else None
+        started = time.monotonic()
+        deadline = started + timeout
         try:
-            logger.info(f"Searching for Chromecast: {chromecast_name}")
-            browser, chromecasts = self._discover(timeout=10)
+            if discovery is None:
+                discovery = DiscoveryService()
+                discovery.start()
+            sent: Dict[str, Dict] = {}
+            version = -1
+            last_new = started
+            while True:
+                version = discovery.wait_for_change(version, 0)
+                for device in discovery.get_devices():
+                    if device["uuid"] not in sent:
+                        sent[device["uuid"]] = device
+                        last_new = time.monotonic()
+                        yield "device", device
+
+                now = time.monotonic()
+                if now >= deadline or (quiet_seconds is not None and now - last_new >= quiet_seconds):
+                    break
+                yield "progress", {"elapsed_seconds": round(now - started, 1), "devices": len(sent)}
+
+                wait = min(heartbeat_seconds, deadline - now)
+                if quiet_seconds is not None:
+                    wait = min(wait, last_new + quiet_seconds - now)
+                discovery.wait_for_change(version, max(wait, 0))
+
+            yield "summary", {
+                "devices": list(sent.values()),
+                "elapsed_seconds": round(time.monotonic() - started, 1),
+                "discovery": self.get_discovery_status(),
+            }
+        finally:
+            self._stop_discovery(discovery)
+
+    def _get_cached_device(self, chromecast_name: str) -> Optional[Dict]:
+        """Get the configured device's last known address, if it is the one asked for"""
+        if self.config_manager is None:
+            return None
+        device = self.config_manager.load().get("chromecast") or {}
+        if device.get("name") != chromecast_name or not device.get("host") or not device.get("uuid"):
+            return None
+        return device
 
-            chromecast = next(
-                (cc for cc in chromecasts if cc.name == chromecast_name),
-                None,
+    def _remember_device(self, cast_info: CastInfo):
+        """Store the current address of the configured device when discovery sees it"""
+        if self.config_manager is None:
+            return
+        if self.config_manager.update_chromecast_address(cast_info.friendly_name, str(cast_info.uuid),
+                                                         cast_info.host, cast_info.port):
+            logger.info(f"Updated the address of {cast_info.friendly_name} to {cast_info.host}:{cast_info.port}")
+
+    def _connect_direct(self, device: Dict) -> Optional[pychromecast.Chromecast]:
+        """Connect to a configured device at its last known address, skipping discovery"""
+        chromecast_name = device["name"]
+        host, port = device["host"], int(device.get("port") or DEFAULT_CAST_PORT)
+        if port != DEFAULT_CAST_PORT:
+            # Cast groups don't serve device info, so whoever has the address can't be checked
+            return None
+        chromecast = None
+        try:
+            # After a DHCP lease change the address may belong to another device
+            info = dial.get_device_info(host, services={HostServiceInfo(host, port)},
+                                        timeout=self.direct_connect_timeout)
+            if info is None or str(info.uuid) != str(UUID(device["uuid"])):
+                logger.info(f"{host}:{port} is no longer {chromecast_name}, falling back to discovery")
+                return None
+            logger.info(f"Connecting directly to {chromecast_name} at {host}:{port}")
+            chromecast = pychromecast.get_chromecast_from_host(
+                (host, port, UUID(device["uuid"]), device.get("model_name"), chromecast_name),
+                tries=1, timeout=self.direct_connect_timeout,
             )
+            chromecast.wait(timeout=self.direct_connect_timeout)
+            return chromecast
+        except Exception as e:
+            logger.info(f"Direct connection to {chromecast_name} failed ({e}), falling back to discovery")
+            if chromecast is not None:
+                try:
+                    chromecast.disconnect(timeout=1)
+                except Exception:
+                    pass
+            return None
+
+    def connect(self, chromecast_name: str, discovery: Optional[DiscoveryService] = None
+                ) -> Optional[Tuple[pychromecast.Chromecast, Optional[DiscoveryService], Dict]]:
+        """Find and connect to a Chromecast, bypassing the connection pool.
+
+        Tries the last known address first, then the discovery registry (or the given
+        `discovery`, owned by the caller), then a one-off mDNS browse. Returns the
+        connected device, the one-off DiscoveryService to stop once it is released
+        (or None) and the timings; None if the device cannot be found or connected to.
+        """
+        started = time.monotonic()
+        temporary = None
+        chromecast = None
+        try:
+            cached_device = self._get_cached_device(chromecast_name)
+            chromecast = self._connect_direct(cached_device) if cached_device else None
+            direct_seconds = time.monotonic() - started
+            if chromecast is not None:
+                return chromecast, None, {
+                    "connect_path": CONNECT_PATH_DIRECT,
+                    "discovery_seconds": 0.0,
+                    "connect_seconds": round(direct_seconds, 3),
+                }
+
+            discovery_started = time.monotonic()
+            logger.info(f"Searching for Chromecast: {chromecast_name}")
+            source = discovery or (self.discovery if self._has_discovery() else None)
+            if source is not None:
+                connect_path = CONNECT_PATH_REGISTRY if source is self.discovery else CONNECT_PATH_MDNS
+            else:
+                connect_path = CONNECT_PATH_MDNS
+                source = temporary = DiscoveryService()
+                temporary.start()
+            # Returns as soon as the device answers; the timeout is only an upper bound
+            cast_info = source.wait_for_device(name=chromecast_name, timeout=10)
 
-            if not chromecast:
+            if cast_info is None:
                 logger.error(f"Chromecast '{chromecast_name}' not found")
-                return False
+                self._stop_discovery(temporary)
+                return None
+            chromecast = pychromecast.get_chromecast_from_cast_info(cast_info, source.zeroconf)
 
+            discovered = time.monotonic()
             logger.info(f"Connecting to Chromecast: {chromecast_name}")
             chromecast.wait(timeout=10)
+            connected = time.monotonic()
+            self._remember_device(chromecast.cast_info)
+
+            timings = {
+                "connect_path": connect_path,
+                "discovery_seconds": round(discovered - discovery_started, 3),
+                "connect_seconds": round(connected - discovered, 3),
+            }
+            if cached_device:
+                timings["direct_connect_seconds"] = round(direct_seconds, 3)
+            return chromecast, temporary, timings
 
-            if volume is not None:
+        except Exception as e:
+            logger.error(f"Error connecting to Chromecast: {e}", exc_info=True)
+            if chromecast is not None:
                 try:
-                    volume = max(0.0, min(1.0, float(volume)))
-                    logger.info(f"Setting volume to {volume}")
-                    chromecast.set_volume(volume)
-                    time.sleep(0.5)
-                except Exception as e:
-                    logger.warning(f"Failed to set volume: {e}")
+                    chromecast.disconnect(timeout=1)
+                except Exception:
+                    pass
+            self._stop_discovery(temporary)
+            return None
+
+    def prepare(self, chromecast_name: str, volume: Optional[float] = None,
+                discovery: Optional[DiscoveryService] = None) -> Optional["PreparedCast"]:
+        """Connect to and set up a Chromecast ahead of playback.
+
+        Uses a pooled connection when the scanner has a pool, otherwise connects (see
+        connect). Returns None if the device cannot be found or connected to.
+        """
+        started = time.monotonic()
+        if self.pool is not None:
+            connection = self.pool.acquire(chromecast_name)
+        else:
+            connection = self.connect(chromecast_name, discovery)
+        if connection is None:
+            return None
+        chromecast, temporary, timings = connection
+
+        if volume is not None:
+            try:
+                volume = max(0.0, min(1.0, float(volume)))
+                logger.info(f"Setting volume to {volume}")
+                chromecast.set_volume(volume)
+                time.sleep(0.5)
+            except Exception as e:
+                logger.warning(f"Failed to set volume: {e}")
+
+        prepared = PreparedCast(chromecast, temporary, pooled=self.pool is not None)
+        prepared.timings.update(timings)
+        prepared.timings["warmup_seconds"] = round(time.monotonic() - started, 3)
+        logger.info(f"Chromecast ready after {prepared.timings['warmup_seconds']}s ({timings['connect_path']})")
+        return prepared
 
+    def play_prepared(self, prepared: "PreparedCast", media_url: str, deadline: Optional[float] = None,
+                      cancelled: Optional[threading.Event] = None) -> bool:
+        """Play media on a prepared Chromecast and release it.
+
+        `deadline` is the monotonic time playback was due at; the delays between it,
+        the play command and the device reporting playback are recorded in
+        `prepared.timings`. Setting `cancelled` while waiting for playback to start
+        stops the media and returns False.
+        """
+        if deadline is None:
+            deadline = time.monotonic()
+        if cancelled is None:
+            cancelled = threading.Event()
+        try:
+            chromecast = prepared.chromecast
             logger.info(f"Playing media: {media_url}")
             chromecast.media_controller.play_media(media_url, content_type="audio/mpeg")
+            prepared.timings["command_delay_seconds"] = round(time.monotonic() - deadline, 3)
 
             # Wait until Chromecast is actually buffering/playing before disconnecting.
             # Without this the cron script exits too fast, closing the socket before
             # the Chromecast has acknowledged the command.
-            deadline = time.time() + 30
-            while time.time() < deadline:
+            timeout = time.time() + 30
+            while time.time() < timeout:
                 status = chromecast.media_controller.status
                 if status and status.player_state in ("PLAYING", "BUFFERING"):
+                    prepared.timings["start_delay_seconds"] = round(time.monotonic() - deadline, 3)
+                    prepared.timings["playing_at"] = time.time()
                     break
-                time.sleep(0.5)
+                if cancelled.wait(0.5):
+                    logger.info("Playback cancelled")
+                    chromecast.media_controller.stop()
+                    return False
             else:
                 logger.warning("Timed out waiting for playback to start")
 
-            logger.info("Media playback started successfully")
+            logger.info(f"Media playback started successfully ({prepared.timings})")
             return True
 
         except Exception as e:
             logger.error(f"Error playing media: {e}", exc_info=True)
             return False
         finally:
-            if browser:
-                try:
-                    browser.stop_discovery()
-                except Exception as e:
-                    logger.warning(f"Error stopping discovery: {e}")
+            self.release(prepared)
+
+    def release(self, prepared: "PreparedCast"):
+        """Hand a pooled Chromecast back to the pool, or disconnect from it and stop its one-off discovery"""
+        if prepared.pooled:
+            self.pool.release(prepared.chromecast)
+            return
+        try:
+            prepared.chromecast.disconnect(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error disconnecting from Chromecast: {e}")
+        self._stop_discovery(prepared.discovery)
+        prepared.discovery = None
+
+    def _stop_discovery(self, discovery: Optional[DiscoveryService]):
+        """Stop a temporary DiscoveryService (the shared one keeps running)"""
+        if discovery is not None and discovery is not self.discovery:
+            discovery.stop()
+
+    def prepare_group(self, chromecast_names: List[str], volume: Optional[float] = None) -> "PreparedGroup":
+        """Prepare several Chromecasts (or cast groups) concurrently, at most `max_play_workers` at a time"""
+        # Devices without a known address share one browse instead of starting one each
+        # (pooled connections outlive the group, so they find devices on their own)
+        discovery = None if self._has_discovery() or self.pool is not None else DiscoveryService()
+        if discovery is not None:
+            discovery.start()
+        group = PreparedGroup(discovery)
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(min(len(chromecast_names), self.max_play_workers), 1),
+                                thread_name_prefix="cast-prepare") as executor:
+            futures = {name: executor.submit(self.prepare, name, volume, discovery) for name in chromecast_names}
+        for name, future in futures.items():
+            prepared = future.result()
+            if prepared is None:
+                group.errors[name] = f"Failed to connect to {name}"
+            else:
+                group.casts[name] = prepared
+        group.timings["warmup_seconds"] = round(time.monotonic() - started, 3)
+        if not group.casts:
+            self.release_group(group)
+        return group
+
+    def play_group(self, group: "PreparedGroup", media_url: str, deadline: Optional[float] = None) -> Dict:
+        """Play media on every prepared Chromecast of a group, all aligned on the same start time.
+
+        Each device gets its own thread, which sends the play command at the shared
+        deadline (or right away if the deadline passed while connecting). Returns the
+        per-device results and the skew between devices:
+        {"devices": {name: {"played", "error", "timings"}}, "command_skew_seconds", "start_skew_seconds"}
+        """
+        if deadline is None:
+            deadline = time.monotonic()
+        # Leave the threads time to start when the deadline is already close or past
+        # (a single device has nothing to be aligned with)
+        lead = GROUP_START_LEAD_SECONDS if len(group.casts) > 1 else 0
+        start_at = max(deadline, time.monotonic() + lead)
+
+        def play_at_start(prepared: PreparedCast) -> bool:
+            remaining = start_at - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            return self.play_prepared(prepared, media_url, deadline=deadline)
+
+        results = {name: {"played": False, "error": error, "timings": {}} for name, error in group.errors.items()}
+        if group.casts:
+            with ThreadPoolExecutor(max_workers=min(len(group.casts), self.max_play_workers),
+                                    thread_name_prefix="cast-play") as executor:
+                futures = {name: executor.submit(play_at_start, prepared) for name, prepared in group.casts.items()}
+            for name, future in futures.items():
+                played = future.result()
+                results[name] = {
+                    "played": played,
+                    "error": None if played else f"Failed to play adhan on {name}",
+                    "timings": dict(group.casts[name].timings),
+                }
+            # play_prepared released them
+            group.casts.clear()
+        self.release_group(group)
+
+        def skew(key: str) -> Optional[float]:
+            values = [result["timings"][key] for result in results.values() if key in result["timings"]]
+            return round(max(values) - min(values), 3) if len(values) > 1 else None
+
+        return {
+            "devices": results,
+            "command_skew_seconds": skew("command_delay_seconds"),
+            "start_skew_seconds": skew("playing_at"),
+        }
+
+    def release_group(self, group: "PreparedGroup"):
+        """Release the devices of a group that were not played, and its discovery"""
+        for prepared in group.casts.values():
+            self.release(prepared)
+        group.casts.clear()
+        self._stop_discovery(group.discovery)
+        group.discovery = None
+
+    def play_media(self, chromecast_name: str, media_url: str, volume: Optional[float] = None) -> bool:
+        """Play media on a specific Chromecast"""
+        prepared = self.prepare(chromecast_name, volume=volume)
+        if not prepared:
+            return False
+        return self.play_prepared(prepared, media_url)
+
+
+def get_group_timings(results: Dict) -> Dict:
+    """Timings of a play_group result: the device's own timings for a single device,
+    otherwise the timings per device and the skews between them"""
+    devices = results.get("devices", {})
+    if len(devices) == 1:
+        return next(iter(devices.values()))["timings"]
+    return {
+        "devices": {name: result["timings"] for name, result in devices.items()},
+        "command_skew_seconds": results.get("command_skew_seconds"),
+        "start_skew_seconds": results.get("start_skew_seconds"),
+    }
+
+
+class PreparedCast:
+    """A Chromecast that was resolved, connected and set up ahead of playback"""
+
+    def __init__(self, chromecast: pychromecast.Chromecast, discovery: Optional[DiscoveryService],
+                 pooled: bool = False):
+        self.chromecast = chromecast
+        # Temporary discovery the device was found with, stopped on release (None for the shared one)
+        self.discovery = discovery
+        # Pooled connections are handed back to the pool instead of being closed
+        self.pooled = pooled
+        self.timings: Dict[str, float] = {}
+
+
+class PreparedGroup:
+    """Chromecasts prepared together to play the same media at the same time"""
+
+    def __init__(self, discovery: Optional[DiscoveryService]):
+        self.casts: Dict[str, PreparedCast] = {}
+        # Devices that could not be prepared, with the reason
+        self.errors: Dict[str, str] = {}
+        self.discovery = discovery
+        self.timings: Dict[str, float] = {}
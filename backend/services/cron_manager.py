@@ -1,12 +1,42 @@
 """Cron job management for scheduling adhan prayers"""
 from crontab import CronTab
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import getpass
+import math
 import os
+import re
 import sys
+import threading
+import time
 
 from backend.config import ConfigManager
+from backend.services.calendar_store import CalendarStore
+from backend.utils.log_tail import follow_file, read_tail, tail_lines
+from backend.utils.prayer_calendar import PrayerCalendar, format_time, parse_time
+
+# Seconds before each prayer at which play_adhan.py connects to the Chromecast.
+# Off by default: a lead moves every job a minute earlier than the prayer.
+DEFAULT_WARMUP_LEAD_SECONDS = 0
+
+# Target time passed to play_adhan.py when the job starts ahead of the prayer
+_AT_ARGUMENT = re.compile(r"--at '?(\d{2}:\d{2})'?")
+
+# A job as written to the crontab: (schedule, command)
+JobSpec = Tuple[str, str]
+
+# Where cron keeps user crontabs (Debian, RHEL, macOS); CRONTAB_SPOOL_FILE overrides
+CRONTAB_SPOOL_DIRS = ("/var/spool/cron/crontabs", "/var/spool/cron", "/usr/lib/cron/tabs")
+
+# Days of date-specific jobs written at once from the stored calendar (1 = daily jobs)
+DEFAULT_SCHEDULE_DAYS_AHEAD = 1
+
+# Separates the prayer from the date in the comment of date-specific jobs
+JOB_DATE_SEPARATOR = "@"
+
+# When the spool file cannot be stat'ed, the cached crontab is re-read this often
+DEFAULT_SNAPSHOT_TTL_SECONDS = 60
 
 
 class CronManager:
@@ -17,6 +47,16 @@ class CronManager:
         self.cron = CronTab(user=True)
         self.job_comment_prefix = "prayer-call-"
         self._config_dir = ConfigManager().config_dir
+        self.warmup_lead = float(os.environ.get("WARMUP_LEAD_SECONDS", DEFAULT_WARMUP_LEAD_SECONDS))
+        self.days_ahead = max(1, int(os.environ.get("SCHEDULE_DAYS_AHEAD", DEFAULT_SCHEDULE_DAYS_AHEAD)))
+        self.stats = {"crontab_writes": 0, "crontab_writes_avoided": 0, "snapshot_hits": 0, "snapshot_misses": 0}
+        self.snapshot_ttl = int(os.environ.get("CRON_SNAPSHOT_TTL", DEFAULT_SNAPSHOT_TTL_SECONDS))
+        self._spool_file = os.environ.get("CRONTAB_SPOOL_FILE") or self._find_spool_file()
+        self._crontab_generation = 0
+        # Guards self.cron, the snapshots and the stats: held for a whole read -> diff -> write
+        self._crontab_lock = threading.Lock()
+        self._crontab_snapshot: Optional[Tuple[tuple, List[Dict]]] = None
+        self._jobs_snapshot: Optional[Tuple[tuple, List[Dict]]] = None
     
     def _refresh_crontab(self):
         """Refresh the crontab object to get the latest state from disk"""
@@ -43,88 +83,283 @@ class CronManager:
             return f"{self.log_dir}/prayer-call-reschedule.log"
         return f"{self.log_dir}/prayer-call-{prayer_key}.log"
     
+    def _get_archive_command(self, prayer_key: str) -> str:
+        """Get the command appended to a job to archive the log of each run (see RunLogArchive)"""
+        archive_script_path = self._get_project_root() / "backend" / "scripts" / "archive_run_log.py"
+        log_file = self._get_log_file_path(prayer_key)
+        archive_log_file = f"{self.log_dir}/prayer-call-archive.log"
+        return (
+            f"; LOG_DIR='{self.log_dir}' {sys.executable} {archive_script_path.absolute()} "
+            f"'{prayer_key}' $? {log_file} >> {archive_log_file} 2>&1"
+        )
+    
+    def _get_log_mtime(self, prayer_key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self._get_log_file_path(prayer_key))
+        except OSError:
+            return None
+    
     def get_last_run_time(self, prayer_key: str) -> Optional[datetime]:
         """Get the last run time for a cron job by checking log file modification time"""
-        log_file = self._get_log_file_path(prayer_key)
-        if os.path.exists(log_file):
-            try:
-                mtime = os.path.getmtime(log_file)
-                return datetime.fromtimestamp(mtime)
-            except Exception:
-                return None
+        mtime = self._get_log_mtime(prayer_key)
+        return datetime.fromtimestamp(mtime) if mtime is not None else None
+    
+    @staticmethod
+    def _find_spool_file() -> Optional[str]:
+        """Locate the current user's crontab file in the cron spool"""
+        try:
+            user = getpass.getuser()
+        except Exception:
+            return None
+        for spool_dir in CRONTAB_SPOOL_DIRS:
+            if os.path.isdir(spool_dir):
+                return os.path.join(spool_dir, user)
         return None
     
+    def _get_crontab_state(self) -> tuple:
+        """Get a value that changes whenever the user crontab may have changed.
+        
+        Combines the spool file's mtime, our own writes and the reschedule job's log
+        (the other process that rewrites the crontab). Without a readable spool file
+        the state also changes every `snapshot_ttl` seconds.
+        """
+        spool_state = None
+        if self._spool_file:
+            try:
+                spool_state = os.stat(self._spool_file).st_mtime_ns
+            except FileNotFoundError:
+                spool_state = 0 if os.access(os.path.dirname(self._spool_file), os.X_OK) else None
+            except OSError:
+                spool_state = None
+        if spool_state is None:
+            spool_state = ("ttl", int(time.time() // max(self.snapshot_ttl, 1)))
+        return spool_state, self._crontab_generation, self._get_log_mtime("reschedule")
+    
     def get_job_logs(self, prayer_key: str, max_lines: int = 100) -> Optional[str]:
         """Get logs from the last run of a cron job"""
         log_file = self._get_log_file_path(prayer_key)
         if os.path.exists(log_file):
             try:
-                with open(log_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    # Return the last max_lines lines
-                    return ''.join(lines[-max_lines:])
+                # Return the last max_lines lines, reading backwards from the end
+                return ''.join(tail_lines(log_file, max_lines))
             except Exception as e:
                 return f"Error reading log file: {str(e)}"
         return None
     
+    def follow_job_logs(self, prayer_key: str, max_lines: int = 100,
+                        timeout: Optional[float] = None) -> Iterator[Optional[str]]:
+        """Yield the last max_lines log lines of a job, then new lines as they are written.
+        
+        Yields None when there is nothing new (see follow_file).
+        """
+        log_file = self._get_log_file_path(prayer_key)
+        offset = 0
+        try:
+            lines, offset = read_tail(log_file, max_lines)
+            yield from lines
+        except OSError:
+            pass
+        yield from follow_file(log_file, offset, timeout=timeout)
+    
+    def get_stats(self) -> Dict:
+        """Get crontab write counters"""
+        with self._crontab_lock:
+            return {"backend": "cron", **self.stats}
+    
+    @staticmethod
+    def _get_job_spec(job) -> Optional[JobSpec]:
+        """Get the (schedule, command) of an existing job, None if it is disabled"""
+        if not job.is_enabled():
+            return None
+        return str(job.slices), str(job.command)
+    
+    def _apply_jobs(self, desired: Dict[str, JobSpec], managed: Callable[[str], bool]) -> bool:
+        """Make the managed jobs match `desired` (keyed by comment) with at most one write.
+        
+        Jobs whose comment is not managed are left alone. Unchanged jobs are kept as
+        they are, and the crontab is only written when a line was added or removed.
+        Returns True if the crontab changed.
+        """
+        with self._crontab_lock:
+            # Diff against the crontab on disk, not a copy another process may have outdated
+            self._refresh_crontab()
+        
+            kept = set()
+            changed = False
+            existing: Dict[str, List] = {}
+            for job in self.cron:
+                if job.comment and managed(job.comment):
+                    existing.setdefault(job.comment, []).append(job)
+        
+            for comment, jobs in existing.items():
+                if len(jobs) == 1 and comment in desired and self._get_job_spec(jobs[0]) == desired[comment]:
+                    kept.add(comment)
+                    continue
+                for job in jobs:
+                    self.cron.remove(job)
+                changed = True
+        
+            for comment, (schedule, command) in desired.items():
+                if comment in kept:
+                    continue
+                job = self.cron.new(command=command, comment=comment)
+                job.setall(schedule)
+                changed = True
+        
+            if changed:
+                # python-crontab installs the whole table with a single `crontab <file>` call
+                self.cron.write()
+                self._crontab_generation += 1
+                self.stats["crontab_writes"] += 1
+            else:
+                self.stats["crontab_writes_avoided"] += 1
+            return changed
+    
+    def _is_prayer_job(self, comment: str) -> bool:
+        return comment.startswith(self.job_comment_prefix) and comment != f"{self.job_comment_prefix}reschedule"
+    
     def clear_all_jobs(self):
         """Remove all prayer call cron jobs (but keep reschedule job)"""
-        reschedule_comment = f"{self.job_comment_prefix}reschedule"
-        jobs_to_remove = [
-            job for job in self.cron
-            if job.comment and job.comment.startswith(self.job_comment_prefix) 
-            and job.comment != reschedule_comment
-        ]
-        for job in jobs_to_remove:
-            self.cron.remove(job)
-        self.cron.write()
+        self._apply_jobs({}, self._is_prayer_job)
     
-    def schedule_prayers(self, prayer_times: Dict[str, str], chromecast_name: str):
-        """Schedule cron jobs for all prayer times"""
-        # Clear existing prayer jobs (but keep reschedule job)
-        self.clear_all_jobs()
+    def _get_prayer_job_specs(self, prayer_times: Dict[str, str], chromecast_name: str,
+                              day: Optional[date] = None) -> Dict[str, JobSpec]:
+        """Build the cron jobs of a set of prayer times, keyed by comment.
         
+        Without `day` the jobs repeat daily; with it they only fire on that date.
+        """
         # Get project root directory (where config.json is located)
         project_root = self._get_project_root()
         config_dir = self._get_config_dir()
         script_path = self._get_script_path()
         
+        specs = {}
         for prayer_key, time_str in prayer_times.items():
             if not time_str:
                 continue
             
             try:
                 # Parse time (format: "HH:MM")
-                hour, minute = map(int, time_str.split(":"))
+                prayer_minutes = parse_time(time_str)
+                
+                # Start early enough to connect before the prayer; the script waits for --at
+                arguments = ""
+                lead_minutes = 0
+                if self.warmup_lead > 0:
+                    lead_minutes = math.ceil(self.warmup_lead / 60)
+                    arguments = f" --at '{format_time(prayer_minutes)}'"
                 
-                # Create cron job with logging and CONFIG_DIR env var
+                comment = f"{self.job_comment_prefix}{prayer_key}"
+                if day is None:
+                    hour, minute = divmod((prayer_minutes - lead_minutes) % (24 * 60), 60)
+                    schedule = f"{minute} {hour} * * *"
+                else:
+                    # The start may fall on the previous day; --date keeps the job from
+                    # firing again a year later if it is never cleaned up
+                    start = datetime.combine(day, datetime.min.time()) + timedelta(minutes=prayer_minutes - lead_minutes)
+                    schedule = f"{start.minute} {start.hour} {start.day} {start.month} *"
+                    comment = f"{comment}{JOB_DATE_SEPARATOR}{day.isoformat()}"
+                    arguments += f" --date '{day.isoformat()}'"
+                
+                # Cron job with logging and CONFIG_DIR env var; the log of each run is archived afterwards
                 log_file = self._get_log_file_path(prayer_key)
-                job = self.cron.new(
-                    command=f"cd {project_root} && CONFIG_DIR='{config_dir}' {sys.executable} {script_path} '{chromecast_name}' '{prayer_key}' > {log_file} 2>&1",
-                    comment=f"{self.job_comment_prefix}{prayer_key}"
+                specs[comment] = (
+                    schedule,
+                    f"cd {project_root} && CONFIG_DIR='{config_dir}' {sys.executable} {script_path} '{chromecast_name}' '{prayer_key}'{arguments} > {log_file} 2>&1"
+                    f"{self._get_archive_command(prayer_key)}",
                 )
-                job.setall(f"{minute} {hour} * * *")
                 
             except Exception as e:
                 print(f"Error scheduling {prayer_key}: {e}")
+        return specs
+    
+    def _get_calendar(self) -> Optional[PrayerCalendar]:
+        """Get the stored calendar of the configured mosque (never fetches it)"""
+        mosque = ConfigManager(self._config_dir).load().get("mosque") or {}
+        if not mosque.get("uuid"):
+            return None
+        return CalendarStore(self._config_dir).get_calendar(mosque["uuid"])
+    
+    def _get_upcoming_job_specs(self, prayer_times: Dict[str, str], chromecast_name: str,
+                                today: date) -> Dict[str, JobSpec]:
+        """Build date-specific jobs for today (from prayer_times) and the next days (from the calendar).
         
-        # Recreate reschedule job if it was removed
-        self.schedule_reschedule_job()
+        Stops at the first day the stored calendar does not cover.
+        """
+        specs = self._get_prayer_job_specs(prayer_times, chromecast_name, today)
+        calendar = self._get_calendar()
+        for offset in range(1, self.days_ahead):
+            day = today + timedelta(days=offset)
+            times = calendar.times_for(day, include_shuruq=False) if calendar else {}
+            if not times:
+                print(f"No stored prayer times for {day.isoformat()}, scheduled {offset} day(s) ahead")
+                break
+            specs.update(self._get_prayer_job_specs(times, chromecast_name, day))
+        return specs
+    
+    def schedule_prayers(self, prayer_times: Dict[str, str], chromecast_name: str):
+        """Schedule cron jobs for all prayer times (and the reschedule job, if it was removed).
         
-        self.cron.write()
+        With SCHEDULE_DAYS_AHEAD > 1, prayer_times are today's and date-specific jobs
+        for the following days are added from the stored calendar.
+        """
+        if self.days_ahead > 1:
+            desired = self._get_upcoming_job_specs(prayer_times, chromecast_name, date.today())
+        else:
+            desired = self._get_prayer_job_specs(prayer_times, chromecast_name)
+        desired[f"{self.job_comment_prefix}reschedule"] = self._get_reschedule_job_spec()
+        self._apply_jobs(desired, lambda comment: comment.startswith(self.job_comment_prefix))
         return True
     
-    def get_scheduled_jobs(self) -> List[Dict]:
-        """Get list of currently scheduled jobs with last run time"""
-        # Refresh crontab to get the latest state (important when reschedule job runs at 2am)
-        self._refresh_crontab()
+    def get_scheduled_jobs(self, include_upcoming: bool = False) -> List[Dict]:
+        """Get list of currently scheduled jobs with last run time.
         
-        jobs = []
+        Date-specific jobs of other days than today are only listed with
+        `include_upcoming`. Served from a snapshot that is rebuilt only when the
+        crontab or one of the jobs' log files changed (or the day changed), so
+        polling it is cheap.
+        """
         today = datetime.now().date()
+        with self._crontab_lock:
+            crontab_state = self._get_crontab_state()
+            if self._crontab_snapshot is None or self._crontab_snapshot[0] != crontab_state:
+                # Refresh crontab to get the latest state (important when reschedule job runs at 2am)
+                self._crontab_snapshot = (crontab_state, self._read_crontab_jobs())
+                self._jobs_snapshot = None
+            crontab_jobs = self._crontab_snapshot[1]
+            
+            log_mtimes = tuple(self._get_log_mtime(job["prayer"]) for job in crontab_jobs)
+            jobs_state = (crontab_state, today, log_mtimes)
+            if self._jobs_snapshot is not None and self._jobs_snapshot[0] == jobs_state:
+                self.stats["snapshot_hits"] += 1
+            else:
+                self.stats["snapshot_misses"] += 1
+                jobs = []
+                for job, mtime in zip(crontab_jobs, log_mtimes):
+                    # Get last run time
+                    last_run = datetime.fromtimestamp(mtime) if mtime is not None else None
+                    jobs.append({
+                        **job,
+                        "last_run": last_run.isoformat() if last_run else None,
+                        # Check if executed today
+                        "executed_today": bool(last_run and last_run.date() == today),
+                    })
+                self._jobs_snapshot = (jobs_state, jobs)
+            today_str = today.isoformat()
+            return [
+                dict(job) for job in self._jobs_snapshot[1]
+                if include_upcoming or job["date"] in (None, today_str)
+            ]
+    
+    def _read_crontab_jobs(self) -> List[Dict]:
+        """Read the prayer jobs (name, schedule, planned time, command) from the crontab"""
+        self._refresh_crontab()
         
+        jobs = []
         for job in self.cron:
             if job.comment and job.comment.startswith(self.job_comment_prefix):
                 prayer_key = job.comment.replace(self.job_comment_prefix, "")
+                prayer_key, _, job_date = prayer_key.partition(JOB_DATE_SEPARATOR)
                 # Get the schedule string from job slices (minute, hour, day, month, dow)
                 schedule_parts = job.slices
                 schedule_str = " ".join(str(part) for part in schedule_parts)
@@ -144,41 +379,27 @@ class CronManager:
                     except (ValueError, IndexError, TypeError):
                         pass
                 
-                # Get last run time
-                last_run = self.get_last_run_time(prayer_key)
-                last_run_str = last_run.isoformat() if last_run else None
-                
-                # Check if executed today
-                executed_today = False
-                if last_run:
-                    executed_today = last_run.date() == today
+                # Jobs started ahead of the prayer carry the actual prayer time
+                at_match = _AT_ARGUMENT.search(str(job.command))
+                if at_match:
+                    planned_time = at_match.group(1)
                 
                 jobs.append({
                     "prayer": prayer_key,
                     "schedule": schedule_str,
                     "planned_time": planned_time,
                     "command": str(job.command),
-                    "last_run": last_run_str,
-                    "executed_today": executed_today
+                    "date": job_date or None,
                 })
         return jobs
     
     def remove_job(self, prayer_key: str) -> bool:
         """Remove a specific cron job by prayer name"""
         job_comment = f"{self.job_comment_prefix}{prayer_key}"
-        jobs_to_remove = [
-            job for job in self.cron
-            if job.comment == job_comment
-        ]
-        
-        if not jobs_to_remove:
-            return False
-        
-        for job in jobs_to_remove:
-            self.cron.remove(job)
-        
-        self.cron.write()
-        return True
+        return self._apply_jobs(
+            {},
+            lambda comment: comment == job_comment or comment.startswith(f"{job_comment}{JOB_DATE_SEPARATOR}"),
+        )
     
     def _get_reschedule_script_path(self) -> str:
         """Get the absolute path to the reschedule_prayers.py script"""
@@ -186,30 +407,26 @@ class CronManager:
         script_path = project_root / "backend" / "scripts" / "reschedule_prayers.py"
         return str(script_path.absolute())
     
-    def schedule_reschedule_job(self):
-        """Schedule a daily job at 2am to reschedule prayers"""
-        reschedule_comment = f"{self.job_comment_prefix}reschedule"
-        
-        # Remove existing reschedule job if it exists
-        jobs_to_remove = [
-            job for job in self.cron
-            if job.comment == reschedule_comment
-        ]
-        for job in jobs_to_remove:
-            self.cron.remove(job)
-        
+    def _get_reschedule_job_spec(self) -> JobSpec:
+        """Build the daily 2am reschedule job"""
         # Get project root directory (where config.json is located)
         project_root = self._get_project_root()
         config_dir = self._get_config_dir()
         reschedule_script_path = self._get_reschedule_script_path()
         
-        # Create new reschedule job at 2am daily with logging and CONFIG_DIR env var
+        # Reschedule job at 2am daily with logging and CONFIG_DIR env var
         log_file = self._get_log_file_path("reschedule")
-        job = self.cron.new(
-            command=f"cd {project_root} && CONFIG_DIR='{config_dir}' LOG_DIR='{self.log_dir}' {sys.executable} {reschedule_script_path} > {log_file} 2>&1",
-            comment=reschedule_comment
+        return (
+            "0 2 * * *",  # 2:00 AM every day
+            f"cd {project_root} && CONFIG_DIR='{config_dir}' LOG_DIR='{self.log_dir}' {sys.executable} {reschedule_script_path} > {log_file} 2>&1"
+            f"{self._get_archive_command('reschedule')}",
+        )
+    
+    def schedule_reschedule_job(self):
+        """Schedule a daily job at 2am to reschedule prayers"""
+        reschedule_comment = f"{self.job_comment_prefix}reschedule"
+        self._apply_jobs(
+            {reschedule_comment: self._get_reschedule_job_spec()},
+            lambda comment: comment == reschedule_comment,
         )
-        job.setall("0 2 * * *")  # 2:00 AM every day
-        
-        self.cron.write()
         return True
@@ -0,0 +1,207 @@
+"""Long-lived Chromecast discovery with a registry of the devices seen"""
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from uuid import UUID
+
+import zeroconf as zeroconf_module
+from pychromecast.discovery import CastBrowser, SimpleCastListener
+from pychromecast.models import CastInfo
+
+logger = logging.getLogger(__name__)
+
+
+class _DeviceEntry:
+    """A device in the registry with the times it was first and last seen"""
+
+    def __init__(self, cast_info: CastInfo):
+        self.cast_info = cast_info
+        self.first_seen = time.time()
+        self.last_seen = self.first_seen
+
+    def to_dict(self) -> Dict:
+        info = self.cast_info
+        return {
+            "name": info.friendly_name,
+            "uuid": str(info.uuid),
+            "model_name": info.model_name,
+            "cast_type": info.cast_type,
+            "host": info.host,
+            "port": info.port,
+            "first_seen": datetime.fromtimestamp(self.first_seen).isoformat(timespec="seconds"),
+            "last_seen": datetime.fromtimestamp(self.last_seen).isoformat(timespec="seconds"),
+            "age_seconds": round(time.time() - self.last_seen, 1),
+        }
+
+
+class DiscoveryService:
+    """Keeps one Zeroconf/CastBrowser running and a registry of the Chromecasts it found.
+
+    The registry is filled from the browser's add/update/remove callbacks (which
+    run on zeroconf's thread) and is keyed by uuid, with an index by friendly name.
+    Lookups never wait for the network.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._devices: Dict[str, _DeviceEntry] = {}
+        self._uuids_by_name: Dict[str, str] = {}
+        self._zconf: Optional[zeroconf_module.Zeroconf] = None
+        self._browser: Optional[CastBrowser] = None
+        self._started_at: Optional[float] = None
+        self._last_change: Optional[float] = None
+        # Monotonic times used by wait_for_quiet
+        self._started_monotonic: Optional[float] = None
+        self._last_added_monotonic: Optional[float] = None
+        # Incremented on every registry change, see wait_for_change
+        self._version = 0
+        self._listeners: List[Callable[[CastInfo], None]] = []
+
+    def add_listener(self, callback: Callable[[CastInfo], None]):
+        """Call `callback(cast_info)` (on zeroconf's thread) whenever a device is added or updated"""
+        self._listeners.append(callback)
+
+    @property
+    def zeroconf(self) -> Optional[zeroconf_module.Zeroconf]:
+        """The shared Zeroconf instance (None until started)"""
+        return self._zconf
+
+    def is_running(self) -> bool:
+        return self._browser is not None
+
+    def start(self):
+        """Start browsing for Chromecasts in the background (idempotent)"""
+        with self._condition:
+            if self._browser is not None:
+                return
+            self._zconf = zeroconf_module.Zeroconf()
+            listener = SimpleCastListener(self._on_add, self._on_remove, self._on_update)
+            self._browser = CastBrowser(listener, self._zconf)
+            self._started_at = time.time()
+            self._started_monotonic = time.monotonic()
+        self._browser.start_discovery()
+        logger.info("Chromecast discovery service started")
+
+    def stop(self):
+        with self._condition:
+            browser, zconf = self._browser, self._zconf
+            self._browser = self._zconf = None
+        if browser is None:
+            return
+        try:
+            browser.stop_discovery()
+            zconf.close()
+        except Exception as e:
+            logger.warning(f"Error stopping discovery service: {e}")
+
+    def _on_add(self, uuid: UUID, service: str):
+        self._store(uuid)
+
+    def _on_update(self, uuid: UUID, service: str):
+        self._store(uuid)
+
+    def _on_remove(self, uuid: UUID, service: str, cast_info: CastInfo):
+        with self._condition:
+            entry = self._devices.pop(str(uuid), None)
+            if entry is None:
+                return
+            name = entry.cast_info.friendly_name
+            if self._uuids_by_name.get(name) == str(uuid):
+                del self._uuids_by_name[name]
+            self._last_change = time.time()
+            self._version += 1
+            self._condition.notify_all()
+        logger.info(f"Chromecast gone: {name}")
+
+    def _store(self, uuid: UUID):
+        browser = self._browser
+        cast_info = browser.devices.get(uuid) if browser is not None else None
+        if cast_info is None:
+            return
+        key = str(uuid)
+        with self._condition:
+            entry = self._devices.get(key)
+            if entry is None:
+                entry = self._devices[key] = _DeviceEntry(cast_info)
+                self._last_added_monotonic = time.monotonic()
+                logger.info(f"Chromecast found: {cast_info.friendly_name} ({cast_info.host}:{cast_info.port})")
+            else:
+                if entry.cast_info.friendly_name != cast_info.friendly_name:
+                    self._uuids_by_name.pop(entry.cast_info.friendly_name, None)
+                entry.cast_info = cast_info
+                entry.last_seen = time.time()
+            self._uuids_by_name[cast_info.friendly_name] = key
+            self._last_change = time.time()
+            self._version += 1
+            self._condition.notify_all()
+        for callback in self._listeners:
+            try:
+                callback(cast_info)
+            except Exception as e:
+                logger.warning(f"Error in discovery listener: {e}")
+
+    def _lookup_locked(self, name: Optional[str], uuid: Optional[str]) -> Optional[CastInfo]:
+        if uuid is None and name is not None:
+            uuid = self._uuids_by_name.get(name)
+        entry = self._devices.get(str(uuid)) if uuid is not None else None
+        return entry.cast_info if entry else None
+
+    def get_cast_info(self, name: Optional[str] = None, uuid: Optional[str] = None) -> Optional[CastInfo]:
+        """Look up a device by uuid or friendly name"""
+        with self._condition:
+            return self._lookup_locked(name, uuid)
+
+    def wait_for_device(self, name: Optional[str] = None, uuid: Optional[str] = None,
+                        timeout: float = 10) -> Optional[CastInfo]:
+        """Wait until a device with this name or uuid is registered (None after `timeout` seconds).
+
+        Returns as soon as the browser reports the device, or at once if it is already known.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._lookup_locked(name, uuid) is not None, timeout)
+            return self._lookup_locked(name, uuid)
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Wait until the registry differs from `version` (at most `timeout` seconds); returns the current version.
+
+        Start with version -1 to get the current one without waiting.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def wait_for_quiet(self, quiet_seconds: float, timeout: float):
+        """Wait until no new device has appeared for `quiet_seconds`, at most `timeout` seconds.
+
+        The quiet interval is counted from the last new device, or from the start of
+        discovery if none appeared yet.
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                last_activity = self._last_added_monotonic or self._started_monotonic or now
+                quiet_until = last_activity + quiet_seconds
+                if now >= deadline or now >= quiet_until:
+                    return
+                self._condition.wait(min(deadline, quiet_until) - now)
+
+    def get_devices(self) -> List[Dict]:
+        """Get the devices currently in the registry, with their last-seen times"""
+        with self._condition:
+            entries = list(self._devices.values())
+        return sorted((entry.to_dict() for entry in entries), key=lambda device: device["name"] or "")
+
+    def get_status(self) -> Dict:
+        """Describe how fresh the registry is"""
+        with self._condition:
+            now = time.time()
+            return {
+                "running": self._browser is not None,
+                "device_count": len(self._devices),
+                "running_seconds": round(now - self._started_at, 1) if self._started_at else None,
+                "last_change": datetime.fromtimestamp(self._last_change).isoformat(timespec="seconds") if self._last_change else None,
+                "seconds_since_change": round(now - self._last_change, 1) if self._last_change else None,
+            }
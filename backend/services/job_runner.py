@@ -0,0 +1,171 @@
+"""Background jobs for slow Chromecast operations started from the API"""
+import os
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Jobs running at the same time
+DEFAULT_WORKERS = 2
+
+# Jobs queued or running at the same time; more are refused
+DEFAULT_MAX_ACTIVE_JOBS = 4
+
+# How many finished jobs are kept for the status endpoint
+MAX_FINISHED_JOBS = 50
+
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_SUCCEEDED = "succeeded"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+FINAL_STATES = (STATE_SUCCEEDED, STATE_FAILED, STATE_CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when `max_active_jobs` jobs are already queued or running"""
+
+
+class JobCancelled(Exception):
+    """Raised by a job function that stopped because the job was cancelled"""
+
+
+class Job:
+    """State of one background job, passed to its function"""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.state = STATE_QUEUED
+        # What a running job is doing right now, set by its function
+        self.step: Optional[str] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if the job was cancelled (for job functions)"""
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        def isoformat(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).isoformat(timespec="seconds") if timestamp else None
+
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "state": self.state,
+            "step": self.step,
+            "result": self.result,
+            "error": self.error,
+            "created_at": isoformat(self.created_at),
+            "started_at": isoformat(self.started_at),
+            "finished_at": isoformat(self.finished_at),
+            "duration_seconds": round(self.finished_at - self.started_at, 3)
+            if self.started_at and self.finished_at else None,
+        }
+
+
+class JobRunner:
+    """Runs jobs on a bounded thread pool so API requests return at once.
+
+    Jobs beyond `workers` wait in the queue; submit() refuses new jobs once
+    `max_active_jobs` are queued or running. Cancelling a queued job drops it;
+    a running job is told through `job.cancelled` and stops at its next check.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_active_jobs: Optional[int] = None):
+        if workers is None:
+            workers = int(os.environ.get("JOB_WORKERS", DEFAULT_WORKERS))
+        if max_active_jobs is None:
+            max_active_jobs = int(os.environ.get("JOB_MAX_ACTIVE", DEFAULT_MAX_ACTIVE_JOBS))
+        self.workers = max(workers, 1)
+        self.max_active_jobs = max(max_active_jobs, self.workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(self, kind: str, function: Callable[..., Any], params: Optional[Dict[str, Any]] = None,
+               **kwargs) -> Job:
+        """Queue `function(job, **kwargs)`; its return value becomes the job's result.
+
+        `params` is shown in the job's status. Raises JobQueueFull when too many jobs
+        are active.
+        """
+        job = Job(kind, params or {})
+        with self._lock:
+            active = sum(1 for other in self._jobs.values() if not other.done.is_set())
+            if active >= self.max_active_jobs:
+                raise JobQueueFull(f"{active} jobs already queued or running")
+            self._jobs[job.id] = job
+            finished = [key for key, value in self._jobs.items() if value.done.is_set()]
+            for key in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+                del self._jobs[key]
+        self._executor.submit(self._run, job, function, kwargs)
+        return job
+
+    def _run(self, job: Job, function: Callable[..., Any], kwargs: Dict[str, Any]):
+        with self._lock:
+            if job.cancelled.is_set():
+                # Cancelled while queued; cancel() already finished it
+                return
+            job.state = STATE_RUNNING
+            job.started_at = time.time()
+        try:
+            job.result = function(job, **kwargs)
+            job.state = STATE_SUCCEEDED
+        except JobCancelled:
+            job.state = STATE_CANCELLED
+        except Exception as e:
+            logger.error(f"Error in {job.kind} job {job.id}: {e}", exc_info=True)
+            job.state, job.error = STATE_FAILED, str(e)
+        finally:
+            job.step = None
+            job.finished_at = time.time()
+            job.done.set()
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        """Describe the recent jobs, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in reversed(jobs)]
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Ask a job to stop; returns the job, or None if the id is unknown"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job.state not in FINAL_STATES:
+                job.cancelled.set()
+                if job.state == STATE_QUEUED:
+                    # Finished right away so it no longer counts as active; the worker skips it
+                    job.state = STATE_CANCELLED
+                    job.finished_at = time.time()
+                    job.done.set()
+        return job
+
+    def shutdown(self):
+        """Cancel every job and stop the workers"""
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False)
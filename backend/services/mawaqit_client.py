@@ -1,64 +1,220 @@
 """Client for interacting with Mawaqit API"""
 from backend.config import ConfigManager
-from mawaqit import AsyncMawaqitClient
-from mawaqit.consts import BadCredentialsException
-from typing import List, Dict, Optional
+from backend.services.calendar_store import CalendarStore
+from backend.services.mawaqit_pool import MawaqitSessionPool
+from backend.services.mosque_index import MosqueIndex
+from backend.utils.prayer_calendar import PrayerCalendar
+from mawaqit.consts import BadCredentialsException, NoMosqueFound
+from typing import Any, Awaitable, Callable, List, Dict, Optional, Tuple
+from concurrent.futures import Future
+import asyncio
+import os
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound for an upstream mosque search before falling back to the local index
+DEFAULT_SEARCH_TIMEOUT_SECONDS = 10
+
+
+class SingleFlight:
+    """Coalesces concurrent calls sharing a key into a single execution.
+
+    The first caller for a key runs the work; callers arriving while it is in
+    flight wait for the same result instead of starting their own. Results are
+    shared through a thread-safe Future, so callers may live on different
+    threads and event loops (Flask runs each async view on its own loop).
+    """
 
-class MawaqitClient:
     def __init__(self):
-        self.config_manager = ConfigManager()
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.stats = {"calls": 0, "executions": 0, "deduplicated": 0}
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get a snapshot of the counters"""
+        with self._lock:
+            return dict(self.stats)
+
+    async def run(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `work()` for `key`, or join the execution already in flight"""
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.stats["executions"] += 1
+            else:
+                self.stats["deduplicated"] += 1
+
+        if not is_leader:
+            return await asyncio.wrap_future(future)
 
-    async def search_mosques(self, query: str) -> List[Dict]:
-        """Search for mosques by name or location"""
-        client = None
         try:
-            config = self.config_manager.load()
-            client = AsyncMawaqitClient(
-                username=config.get("mawaqit", {}).get("username"),
-                password=config.get("mawaqit", {}).get("password")
-            )
+            result = await work()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
 
-            await client.get_api_token()
 
-            data = await client.fetch_mosques_by_keyword(query)
-            # API returns a list directly, not a dict with "mosques" key
-            if isinstance(data, list):
-                return data
-            # Fallback: if it's a dict, try to get "mosques" key
-            return data.get("mosques", []) if isinstance(data, dict) else []
+class MawaqitClient:
+    def __init__(self, session_pool: Optional[MawaqitSessionPool] = None):
+        self.config_manager = ConfigManager()
+        self.calendar_store = CalendarStore(self.config_manager.config_dir)
+        self.session_pool = session_pool or MawaqitSessionPool()
+        self._prayer_times_flight = SingleFlight()
+        self.mosque_index = MosqueIndex(self.config_manager.config_dir)
+        self.search_timeout = float(os.environ.get("MOSQUE_SEARCH_TIMEOUT", DEFAULT_SEARCH_TIMEOUT_SECONDS))
+        self._searches_lock = threading.Lock()
+        self._latest_searches: Dict[str, Tuple[asyncio.AbstractEventLoop, asyncio.Task, threading.Event]] = {}
+
+    def _get_credentials(self) -> Tuple[Optional[str], Optional[str]]:
+        """Get the configured Mawaqit (username, password)"""
+        mawaqit_config = self.config_manager.load().get("mawaqit") or {}
+        return mawaqit_config.get("username"), mawaqit_config.get("password")
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get upstream API counters (handshakes, token refreshes, deduplicated fetches, ...)"""
+        return {
+            "session_pool": self.session_pool.get_stats(),
+            "prayer_times": self._prayer_times_flight.get_stats(),
+        }
+
+    async def search_mosques(self, query: str, client_id: Optional[str] = None) -> List[Dict]:
+        """Search for mosques by name or location.
+
+        Queries extending one already answered upstream are served from the local
+        mosque index. Other queries go upstream, bounded by MOSQUE_SEARCH_TIMEOUT;
+        a newer query from the same `client_id` cancels the one in flight. When the
+        upstream search fails, times out or is superseded, local matches are returned.
+        """
+        if self.mosque_index.is_covered(query):
+            return self.mosque_index.search(query)
+
+        loop = asyncio.get_running_loop()
+        task = loop.create_task(self._search_upstream(query))
+        superseded = threading.Event()
+        if client_id:
+            self._register_search(client_id, loop, task, superseded)
+
+        try:
+            data = await asyncio.wait_for(task, timeout=self.search_timeout)
+        except asyncio.CancelledError:
+            if not superseded.is_set():
+                raise
+            logger.info(f"Mosque search for '{query}' superseded by a newer query")
+            return self.mosque_index.search(query)
+        except asyncio.TimeoutError:
+            logger.warning(f"Mosque search for '{query}' timed out, using local index")
+            return self.mosque_index.search(query)
         except BadCredentialsException as e:
             logger.error(f"Bad credentials: {e}")
-            return []
+            return self.mosque_index.search(query)
         except Exception as e:
             logger.error(f"Error searching mosques: {e}")
-            return []
+            return self.mosque_index.search(query)
         finally:
-            if client:
-                await client.close()
-    
-    async def get_prayer_times(self, mosque_id: str) -> Optional[Dict]:
-        """Get prayer times for a mosque"""
-        client = None
+            if client_id:
+                self._unregister_search(client_id, task)
+
+        self.mosque_index.add(data, query)
+        seen = {mosque.get("uuid") for mosque in data}
+        local_matches = [m for m in self.mosque_index.search(query) if m["uuid"] not in seen]
+        return data + local_matches
+
+    def _register_search(self, client_id: str, loop: asyncio.AbstractEventLoop,
+                         task: asyncio.Task, superseded: threading.Event):
+        """Make `task` the client's current search, cancelling the previous one"""
+        with self._searches_lock:
+            previous = self._latest_searches.get(client_id)
+            self._latest_searches[client_id] = (loop, task, superseded)
+        if previous:
+            previous_loop, previous_task, previous_superseded = previous
+            previous_superseded.set()
+            # The previous search runs on another request's event loop
+            try:
+                previous_loop.call_soon_threadsafe(previous_task.cancel)
+            except RuntimeError:
+                pass  # That loop was closed meanwhile: the previous search is already over
+
+    def _unregister_search(self, client_id: str, task: asyncio.Task):
+        with self._searches_lock:
+            current = self._latest_searches.get(client_id)
+            if current and current[1] is task:
+                del self._latest_searches[client_id]
+
+    async def _search_upstream(self, query: str) -> List[Dict]:
+        """Search for mosques with the Mawaqit API"""
         try:
-            config = self.config_manager.load()
-            client = AsyncMawaqitClient(
-                username=config.get("mawaqit", {}).get("username"),
-                password=config.get("mawaqit", {}).get("password"),
-                mosque=mosque_id
+            data = await self.session_pool.run(
+                self._get_credentials(),
+                lambda client: client.fetch_mosques_by_keyword(query),
             )
-            await client.get_api_token()
+        except NoMosqueFound:
+            return []
+        # API returns a list directly, not a dict with "mosques" key
+        if isinstance(data, list):
+            return data
+        # Fallback: if it's a dict, try to get "mosques" key
+        return data.get("mosques", []) if isinstance(data, dict) else []
 
-            data = await client.fetch_prayer_times()
+    async def get_prayer_times(self, mosque_id: str, refresh: bool = False) -> Optional[Dict]:
+        """Get prayer times for a mosque.
 
+        Served from the local calendar store while the stored entry is fresh; the
+        API is only called when the entry is stale, missing or `refresh` is set.
+        Concurrent callers for the same mosque share a single API call.
+        If the API call fails, a stale stored entry is returned rather than nothing.
+        """
+        entry = self.calendar_store.get_entry(mosque_id)
+        if not refresh and self.calendar_store.is_fresh(entry):
+            return entry["data"]
+
+        data = await self._prayer_times_flight.run(
+            mosque_id, lambda: self._fetch_and_store_prayer_times(mosque_id)
+        )
+        if data:
             return data
+
+        if entry:
+            logger.warning(f"Using stale stored calendar for mosque {mosque_id}")
+            return entry["data"]
+        return None
+
+    async def get_prayer_calendar(self, mosque_id: str, refresh: bool = False) -> Optional[PrayerCalendar]:
+        """Get the parsed yearly calendar of a mosque (same freshness rules as get_prayer_times)"""
+        if not await self.get_prayer_times(mosque_id, refresh=refresh):
+            return None
+        return self.calendar_store.get_calendar(mosque_id)
+
+    def get_calendar_hash(self, mosque_id: str) -> Optional[str]:
+        """Get the content hash of the stored calendar of a mosque"""
+        return self.calendar_store.get_hash(mosque_id)
+
+    async def _fetch_and_store_prayer_times(self, mosque_id: str) -> Optional[Dict]:
+        """Fetch prayer times for a mosque and store them when the fetch succeeded"""
+        data = await self._fetch_prayer_times(mosque_id)
+        if data:
+            self.calendar_store.put(mosque_id, data)
+        return data
+
+    async def _fetch_prayer_times(self, mosque_id: str) -> Optional[Dict]:
+        """Fetch prayer times for a mosque from the Mawaqit API"""
+        try:
+            return await self.session_pool.run(
+                self._get_credentials(),
+                lambda client: client.fetch_prayer_times(),
+                mosque=mosque_id,
+            )
         except Exception as e:
             logger.error(f"Error getting prayer times: {e}")
             return None
-        finally:
-            if client:
-                await client.close()
-
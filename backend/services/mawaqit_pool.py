@@ -0,0 +1,160 @@
+"""Long-lived, authenticated Mawaqit API sessions shared across requests"""
+import asyncio
+import atexit
+import os
+import threading
+import time
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import aiohttp
+from mawaqit import AsyncMawaqitClient
+from mawaqit.consts import BadCredentialsException, NotAuthenticatedException
+
+logger = logging.getLogger(__name__)
+
+# Mawaqit does not advertise token lifetimes; tokens are re-acquired after this
+# long, or immediately when the API rejects them.
+DEFAULT_TOKEN_TTL_SECONDS = 12 * 3600
+
+Credentials = Tuple[Optional[str], Optional[str]]
+
+
+class _PooledSession:
+    """One HTTP session and its API token for a credential set"""
+
+    def __init__(self, session: aiohttp.ClientSession):
+        self.session = session
+        self.token: Optional[str] = None
+        self.token_expires_at = 0.0
+        self.token_lock = asyncio.Lock()
+
+
+class MawaqitSessionPool:
+    """Keeps one authenticated aiohttp session per Mawaqit credential set.
+
+    aiohttp sessions are bound to the event loop they were created on, while
+    Flask runs every async view on a loop of its own. The pool therefore owns a
+    background event loop: all API calls run there, and callers on any loop or
+    thread await them through `run()`.
+    """
+
+    def __init__(self, token_ttl: Optional[int] = None):
+        if token_ttl is None:
+            token_ttl = int(os.environ.get("MAWAQIT_TOKEN_TTL", DEFAULT_TOKEN_TTL_SECONDS))
+        self.token_ttl = token_ttl
+        self._sessions: Dict[Credentials, _PooledSession] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "handshakes": 0,
+            "token_refreshes": 0,
+            "reauthentications": 0,
+            "sessions_created": 0,
+            "requests": 0,
+        }
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get a snapshot of the pool counters"""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the background event loop on first use"""
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="mawaqit-session-pool", daemon=True
+                )
+                thread.start()
+                self._loop = loop
+                atexit.register(self.close)
+            return self._loop
+
+    async def _on_connection_created(self, session, context, params):
+        """aiohttp trace hook, called for every new TCP/TLS connection"""
+        self._count("handshakes")
+
+    def _get_session(self, credentials: Credentials) -> _PooledSession:
+        """Get (or create) the pooled session of a credential set. Runs on the pool loop."""
+        pooled = self._sessions.get(credentials)
+        if pooled is None or pooled.session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_connection_create_end.append(self._on_connection_created)
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(keepalive_timeout=60),
+                trace_configs=[trace_config],
+            )
+            pooled = _PooledSession(session)
+            self._sessions[credentials] = pooled
+            self._count("sessions_created")
+        return pooled
+
+    async def _get_token(self, credentials: Credentials, pooled: _PooledSession,
+                         rejected_token: Optional[str] = None) -> str:
+        """Get a valid API token, logging in only if it is missing, expired or was rejected"""
+        async with pooled.token_lock:
+            token_valid = pooled.token is not None and time.monotonic() < pooled.token_expires_at
+            # Another caller may already have replaced the rejected token
+            if token_valid and pooled.token != rejected_token:
+                return pooled.token
+
+            username, password = credentials
+            client = AsyncMawaqitClient(username=username, password=password, session=pooled.session)
+            await client.login()
+            pooled.token = client.token
+            pooled.token_expires_at = time.monotonic() + self.token_ttl
+            self._count("token_refreshes")
+            return pooled.token
+
+    async def _run(self, credentials: Credentials, operation: Callable[[AsyncMawaqitClient], Awaitable[Any]],
+                   mosque: Optional[str]) -> Any:
+        pooled = self._get_session(credentials)
+        username, password = credentials
+        token = await self._get_token(credentials, pooled)
+        client = AsyncMawaqitClient(
+            username=username, password=password, mosque=mosque, token=token, session=pooled.session
+        )
+        self._count("requests")
+        try:
+            return await operation(client)
+        except (BadCredentialsException, NotAuthenticatedException) as e:
+            logger.info(f"Mawaqit token rejected ({e}), re-authenticating")
+            self._count("reauthentications")
+            client.token = await self._get_token(credentials, pooled, rejected_token=token)
+            return await operation(client)
+
+    async def run(self, credentials: Credentials, operation: Callable[[AsyncMawaqitClient], Awaitable[Any]],
+                  mosque: Optional[str] = None) -> Any:
+        """Run `operation(client)` with an authenticated client sharing the pooled session.
+
+        Can be awaited from any event loop; the call itself runs on the pool loop.
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self._run(credentials, operation, mosque), self._ensure_loop()
+        )
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        """Close all pooled sessions and stop the background loop"""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is None or not loop.is_running():
+            return
+
+        async def _close_sessions():
+            for pooled in self._sessions.values():
+                await pooled.session.close()
+            self._sessions.clear()
+
+        try:
+            asyncio.run_coroutine_threadsafe(_close_sessions(), loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error closing Mawaqit sessions: {e}")
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,195 @@
+"""Local index of mosques seen in Mawaqit search results"""
+import json
+import os
+import threading
+import time
+import unicodedata
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+
+from backend.config import ConfigManager
+
+logger = logging.getLogger(__name__)
+
+MOSQUE_INDEX_VERSION = 1
+
+# An upstream search returning at least this many results is assumed to be
+# truncated, so it does not prove that longer queries have nothing more to find.
+DEFAULT_SEARCH_PAGE_SIZE = 20
+
+# A query answered upstream covers longer queries for this long, after which it is
+# sent upstream again so new or renamed mosques show up
+DEFAULT_COVERAGE_TTL_SECONDS = 24 * 3600
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Lowercase, strip accents and collapse whitespace for matching"""
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class MosqueIndex:
+    """Answers mosque typeahead queries from previously seen search results.
+
+    Mosques are indexed by the trigrams of their name and localisation, and by
+    the one- and two-letter prefixes of each word for very short queries. The
+    index also remembers which queries were answered upstream: a query
+    extending one of them (e.g. "paris 1" after "paris") is answered locally
+    until that coverage is older than `coverage_ttl` seconds.
+    Everything is persisted to CONFIG_DIR so the index survives restarts.
+    """
+
+    def __init__(self, config_dir: str = None, page_size: Optional[int] = None,
+                 coverage_ttl: Optional[float] = None):
+        if config_dir is None:
+            config_dir = ConfigManager().config_dir
+        if page_size is None:
+            page_size = int(os.environ.get("MOSQUE_SEARCH_PAGE_SIZE", DEFAULT_SEARCH_PAGE_SIZE))
+        if coverage_ttl is None:
+            coverage_ttl = float(os.environ.get("MOSQUE_SEARCH_COVERAGE_TTL", DEFAULT_COVERAGE_TTL_SECONDS))
+
+        self.index_file = os.path.join(config_dir, "mosque_index.json")
+        self.page_size = page_size
+        self.coverage_ttl = coverage_ttl
+        self._lock = threading.Lock()
+        self._mosques: Dict[str, Dict[str, str]] = {}
+        self._haystacks: Dict[str, str] = {}
+        self._trigram_index: Dict[str, Set[str]] = {}
+        self._prefix_index: Dict[str, Set[str]] = {}
+        # Queries answered upstream, with the time they were answered
+        self._searched: Dict[str, float] = {}
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_file):
+            return
+        try:
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            logger.warning(f"Error loading mosque index: {e}")
+            return
+        if data.get("version") != MOSQUE_INDEX_VERSION:
+            return
+        with self._lock:
+            for mosque in data.get("mosques", []):
+                self._add_locked(mosque)
+            searched = data.get("searched", {})
+            # Older indexes kept a plain list without times; that coverage is dropped
+            if isinstance(searched, dict):
+                self._searched.update(searched)
+
+    def _save_locked(self):
+        data = {
+            "version": MOSQUE_INDEX_VERSION,
+            "mosques": list(self._mosques.values()),
+            "searched": dict(sorted(self._searched.items())),
+        }
+        tmp_path = f"{self.index_file}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_file)
+        except (IOError, OSError) as e:
+            logger.warning(f"Error saving mosque index: {e}")
+
+    def _add_locked(self, mosque: Dict) -> bool:
+        uuid = mosque.get("uuid")
+        if not uuid:
+            return False
+        entry = {
+            "uuid": uuid,
+            "name": mosque.get("name") or mosque.get("label") or "",
+            "localisation": mosque.get("localisation") or mosque.get("address") or "",
+        }
+        if self._mosques.get(uuid) == entry:
+            return False
+        if uuid in self._mosques:
+            self._remove_locked(uuid)
+
+        haystack = normalize_text(f"{entry['name']} {entry['localisation']}")
+        self._mosques[uuid] = entry
+        self._haystacks[uuid] = haystack
+        for trigram in _trigrams(haystack):
+            self._trigram_index.setdefault(trigram, set()).add(uuid)
+        for word in haystack.split():
+            for prefix in (word[:1], word[:2]):
+                self._prefix_index.setdefault(prefix, set()).add(uuid)
+        return True
+
+    def _remove_locked(self, uuid: str):
+        haystack = self._haystacks.pop(uuid, "")
+        self._mosques.pop(uuid, None)
+        for trigram in _trigrams(haystack):
+            self._trigram_index.get(trigram, set()).discard(uuid)
+        for word in haystack.split():
+            for prefix in (word[:1], word[:2]):
+                self._prefix_index.get(prefix, set()).discard(uuid)
+
+    def add(self, mosques: Iterable[Dict], query: Optional[str] = None) -> int:
+        """Add upstream search results, optionally recording the query they answer.
+
+        Returns the number of new or changed mosques.
+        """
+        mosques = list(mosques)
+        with self._lock:
+            added = sum(1 for mosque in mosques if self._add_locked(mosque))
+            normalized = normalize_text(query)
+            now = time.time()
+            expired = [key for key, answered_at in self._searched.items() if now - answered_at > self.coverage_ttl]
+            for key in expired:
+                del self._searched[key]
+            searched_changed = bool(expired)
+            if normalized and len(mosques) < self.page_size:
+                self._searched[normalized] = now
+                searched_changed = True
+            if added or searched_changed:
+                self._save_locked()
+        return added
+
+    def is_covered(self, query: str) -> bool:
+        """Check whether the query, or a prefix of it, was answered upstream within the coverage TTL"""
+        normalized = normalize_text(query)
+        if not normalized:
+            return False
+        oldest_allowed = time.time() - self.coverage_ttl
+        with self._lock:
+            return any(self._searched.get(normalized[:length], 0) >= oldest_allowed
+                       for length in range(1, len(normalized) + 1))
+
+    def search(self, query: str, limit: int = 50) -> List[Dict[str, str]]:
+        """Find indexed mosques whose name or localisation contains the query"""
+        normalized = normalize_text(query)
+        if not normalized:
+            return []
+
+        with self._lock:
+            if len(normalized) < 3:
+                candidates = set(self._prefix_index.get(normalized, ()))
+            else:
+                trigram_sets = [self._trigram_index.get(t, set()) for t in _trigrams(normalized)]
+                trigram_sets.sort(key=len)
+                candidates = set(trigram_sets[0]).intersection(*trigram_sets[1:])
+
+            matches = []
+            for uuid in candidates:
+                haystack = self._haystacks[uuid]
+                position = haystack.find(normalized)
+                if position < 0:
+                    continue
+                starts_word = position == 0 or haystack[position - 1] == " "
+                matches.append((position != 0, not starts_word, self._mosques[uuid]["name"], uuid))
+
+            matches.sort()
+            return [dict(self._mosques[uuid]) for *_, uuid in matches[:limit]]
+
+    def __len__(self) -> int:
+        return len(self._mosques)
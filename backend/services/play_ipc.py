@@ -0,0 +1,332 @@
+"""Local IPC between play_adhan.py and the running backend (Unix domain socket)
+
+Protocol: the client connects, sends one JSON object terminated by a newline and
+reads one JSON object back. Requests:
+
+    {"action": "play", "chromecast_name": ..., "prayer_key": ..., "delay": 12.5, "wait": true,
+     "scheduled_at": <epoch>, "process_started_at": <epoch>}
+    {"action": "status", "id": ...}      (no id: all recent plays)
+    {"action": "cancel", "id": ...}
+
+Every response has "ok" (bool) and, on failure, "error". Play and status responses
+describe the play: id, state, prayer_key, chromecast_name, timings, devices (the
+outcome per device when the prayer plays on several) and error.
+This module only uses the standard library so the client stays cheap to import.
+"""
+import itertools
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+if TYPE_CHECKING:
+    from backend.config import ConfigManager
+    from backend.services import ChromecastScanner, RunHistory
+
+logger = logging.getLogger(__name__)
+
+SOCKET_NAME = "play.sock"
+
+# Requests are tiny; anything longer is not a client of ours
+MAX_REQUEST_BYTES = 64 * 1024
+
+# How long a client waits to connect before falling back to playing by itself
+CONNECT_TIMEOUT_SECONDS = 1.0
+
+# How many finished plays are kept for the status action
+MAX_FINISHED_PLAYS = 50
+
+STATE_PENDING = "pending"
+STATE_CONNECTING = "connecting"
+STATE_WAITING = "waiting"
+STATE_PLAYING = "playing"
+STATE_FAILED = "failed"
+STATE_CANCELLED = "cancelled"
+FINAL_STATES = (STATE_PLAYING, STATE_FAILED, STATE_CANCELLED)
+
+
+class PlayIPCUnavailable(Exception):
+    """Raised by the client when no backend is listening on the socket"""
+
+
+def get_socket_path(config_dir: Optional[str] = None) -> str:
+    """Get the socket path (PLAY_SOCKET, or play.sock in the config directory)"""
+    path = os.environ.get("PLAY_SOCKET")
+    if path:
+        return path
+    if config_dir is None:
+        from backend.config import ConfigManager
+        config_dir = ConfigManager().config_dir
+    return os.path.join(config_dir, SOCKET_NAME)
+
+
+def send_request(request: Dict[str, Any], socket_path: Optional[str] = None,
+                 timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Send one request to the backend and return its response.
+
+    Raises PlayIPCUnavailable if nothing listens on the socket; any error after
+    the connection is established is raised as is (the request may have run).
+    """
+    if socket_path is None:
+        socket_path = get_socket_path()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.settimeout(CONNECT_TIMEOUT_SECONDS)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError, socket.timeout) as e:
+            raise PlayIPCUnavailable(str(e))
+
+        sock.settimeout(timeout)
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline(MAX_REQUEST_BYTES)
+        if not line:
+            raise ConnectionError("Backend closed the connection without answering")
+        return json.loads(line)
+    finally:
+        sock.close()
+
+
+class _Play:
+    """State of one play request handled by the backend"""
+
+    def __init__(self, play_id: str, chromecast_name: str, prayer_key: str, deadline: float):
+        self.id = play_id
+        self.chromecast_name = chromecast_name
+        self.prayer_key = prayer_key
+        self.deadline = deadline
+        self.state = STATE_PENDING
+        self.error: Optional[str] = None
+        self.timings: Dict[str, Any] = {}
+        # Per-device results, as returned by ChromecastScanner.play_group
+        self.devices: Dict[str, Dict[str, Any]] = {}
+        self.scheduled_at: Optional[float] = None
+        self.process_started_at: Optional[float] = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "state": self.state,
+            "prayer_key": self.prayer_key,
+            "chromecast_name": self.chromecast_name,
+            "timings": dict(self.timings),
+            "devices": {name: {"played": result["played"], "error": result["error"]}
+                        for name, result in self.devices.items()},
+            "error": self.error,
+        }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            line = self.rfile.readline(MAX_REQUEST_BYTES)
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+            response = self.server.play_server.handle_request(request)
+        except ValueError as e:
+            response = {"ok": False, "error": f"Invalid request: {e}"}
+        except Exception as e:
+            logger.error(f"Error handling IPC request: {e}", exc_info=True)
+            response = {"ok": False, "error": str(e)}
+        try:
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+        except OSError:
+            pass  # Client went away
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class PlayServer:
+    """Serves play/status/cancel requests from play_adhan.py over a Unix socket.
+
+    Plays run in the backend process, so the cron job does not pay for starting
+    the Chromecast stack, and the socket is only reachable by the backend's user.
+    """
+
+    def __init__(self, chromecast_scanner: "ChromecastScanner", config_manager: "ConfigManager",
+                 upload_folder: str, socket_path: Optional[str] = None,
+                 run_history: Optional["RunHistory"] = None):
+        self.chromecast_scanner = chromecast_scanner
+        self.config_manager = config_manager
+        self.upload_folder = upload_folder
+        self.run_history = run_history
+        self.socket_path = socket_path or get_socket_path(config_manager.config_dir)
+
+        self._server: Optional[_UnixServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._plays: "OrderedDict[str, _Play]" = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def start(self):
+        """Bind the socket and serve in a background thread (idempotent)"""
+        if self._server is not None:
+            return
+        self._remove_stale_socket()
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+        server = _UnixServer(self.socket_path, _Handler)
+        server.play_server = self
+        os.chmod(self.socket_path, 0o600)
+        self._server = server
+        self._thread = threading.Thread(target=server.serve_forever, name="play-ipc", daemon=True)
+        self._thread.start()
+        logger.info(f"Play IPC listening on {self.socket_path}")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        try:
+            os.remove(self.socket_path)
+        except OSError:
+            pass
+
+    def _remove_stale_socket(self):
+        """Remove a socket file left by a previous backend, unless one is still serving it"""
+        if not os.path.exists(self.socket_path):
+            return
+        try:
+            send_request({"action": "status"}, self.socket_path, timeout=CONNECT_TIMEOUT_SECONDS)
+        except (PlayIPCUnavailable, OSError, ValueError):
+            os.remove(self.socket_path)
+            return
+        raise RuntimeError(f"Another backend is already listening on {self.socket_path}")
+
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        action = request.get("action")
+        if action == "play":
+            return self._handle_play(request)
+        if action == "status":
+            return self._handle_status(request)
+        if action == "cancel":
+            return self._handle_cancel(request)
+        return {"ok": False, "error": f"Unknown action: {action!r}"}
+
+    def _get_play(self, play_id: Any) -> Optional[_Play]:
+        with self._lock:
+            return self._plays.get(str(play_id))
+
+    def _handle_play(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        chromecast_name = request.get("chromecast_name")
+        prayer_key = request.get("prayer_key")
+        if not chromecast_name or not prayer_key:
+            return {"ok": False, "error": "chromecast_name and prayer_key are required"}
+        try:
+            delay = max(float(request.get("delay") or 0), 0.0)
+            scheduled_at = float(request["scheduled_at"]) if request.get("scheduled_at") else None
+            process_started_at = float(request["process_started_at"]) if request.get("process_started_at") else None
+        except (TypeError, ValueError):
+            return {"ok": False, "error": "delay, scheduled_at and process_started_at must be numbers"}
+
+        play = _Play(str(next(self._ids)), chromecast_name, prayer_key, time.monotonic() + delay)
+        play.scheduled_at = scheduled_at or time.time() + delay
+        play.process_started_at = process_started_at
+        with self._lock:
+            self._plays[play.id] = play
+            finished = [key for key, value in self._plays.items() if value.done.is_set()]
+            for key in finished[:max(len(finished) - MAX_FINISHED_PLAYS, 0)]:
+                del self._plays[key]
+
+        if not request.get("wait", True):
+            threading.Thread(target=self._run_play, args=(play,), name=f"play-{play.id}", daemon=True).start()
+            return {"ok": True, **play.to_dict()}
+
+        self._run_play(play)
+        return {"ok": play.state == STATE_PLAYING, **play.to_dict()}
+
+    def _handle_status(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if request.get("id") is None:
+            with self._lock:
+                plays = [play.to_dict() for play in self._plays.values()]
+            return {"ok": True, "plays": plays}
+        play = self._get_play(request["id"])
+        if play is None:
+            return {"ok": False, "error": f"Unknown play id: {request['id']}"}
+        return {"ok": True, **play.to_dict()}
+
+    def _handle_cancel(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        play = self._get_play(request.get("id"))
+        if play is None:
+            return {"ok": False, "error": f"Unknown play id: {request.get('id')}"}
+        if play.state in FINAL_STATES:
+            return {"ok": False, "error": f"Play already {play.state}", **play.to_dict()}
+        play.cancelled.set()
+        return {"ok": True, **play.to_dict()}
+
+    def _run_play(self, play: _Play):
+        """Resolve the adhan, connect, wait for the deadline and play (same steps as play_adhan.py)"""
+        try:
+            self._play(play)
+        except Exception as e:
+            logger.error(f"Error playing {play.prayer_key} over IPC: {e}", exc_info=True)
+            play.state, play.error = STATE_FAILED, str(e)
+        finally:
+            if self.run_history is not None:
+                from backend.services.run_history import OUTCOME_CANCELLED, OUTCOME_FAILED, OUTCOME_PLAYED
+                outcome = {STATE_PLAYING: OUTCOME_PLAYED, STATE_CANCELLED: OUTCOME_CANCELLED}.get(play.state, OUTCOME_FAILED)
+                # One row per device that got as far as a play command
+                devices = play.devices or {play.chromecast_name: {"played": None, "error": play.error, "timings": play.timings}}
+                for name, result in devices.items():
+                    device_outcome = outcome if result["played"] is None else (OUTCOME_PLAYED if result["played"] else OUTCOME_FAILED)
+                    self.run_history.record(
+                        play.prayer_key, "ipc", device_outcome, chromecast_name=name,
+                        scheduled_at=play.scheduled_at, process_started_at=play.process_started_at,
+                        timings=result["timings"], error=result["error"],
+                    )
+            play.done.set()
+
+    def _play(self, play: _Play):
+        from backend.services.chromecast_scanner import get_group_timings
+        from backend.utils.network_utils import get_media_url
+
+        config = self.config_manager.load()
+        adhan_file = config.get("adhan_files", {}).get(play.prayer_key)
+        if not adhan_file:
+            play.state, play.error = STATE_FAILED, f"No adhan file configured for {play.prayer_key}"
+            return
+        filename = Path(adhan_file).name
+        if not os.path.exists(os.path.join(self.upload_folder, filename)):
+            play.state, play.error = STATE_FAILED, f"Adhan file not found: {filename}"
+            return
+        volume = config.get("adhan_volumes", {}).get(play.prayer_key)
+        targets = self.config_manager.get_chromecast_targets(play.prayer_key, play.chromecast_name)
+
+        play.state = STATE_CONNECTING
+        group = self.chromecast_scanner.prepare_group(targets, volume=volume)
+        if not group.casts:
+            play.devices = {name: {"played": False, "error": error, "timings": {}} for name, error in group.errors.items()}
+            play.state, play.error = STATE_FAILED, "; ".join(group.errors.values()) or "No chromecast configured"
+            return
+        play.timings = get_group_timings({"devices": {
+            name: {"timings": prepared.timings} for name, prepared in group.casts.items()
+        }})
+
+        play.state = STATE_WAITING
+        remaining = play.deadline - time.monotonic()
+        if play.cancelled.wait(remaining) if remaining > 0 else play.cancelled.is_set():
+            self.chromecast_scanner.release_group(group)
+            play.state = STATE_CANCELLED
+            return
+
+        results = self.chromecast_scanner.play_group(group, get_media_url(filename), deadline=play.deadline)
+        play.devices = results["devices"]
+        play.timings = get_group_timings(results)
+        errors = [result["error"] for result in play.devices.values() if not result["played"]]
+        play.error = "; ".join(errors) if errors else None
+        # Any room playing counts as played; the failed ones are in the error and per device
+        play.state = STATE_PLAYING if len(errors) < len(play.devices) else STATE_FAILED
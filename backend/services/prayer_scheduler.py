@@ -0,0 +1,469 @@
+"""In-process adhan scheduler (alternative to one cron job per prayer)"""
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING, Deque, Dict, Iterator, List, Optional, Tuple
+
+from backend.utils.prayer_calendar import parse_time
+from backend.utils.network_utils import get_media_url
+from backend.services.chromecast_scanner import get_group_timings
+from backend.services.run_history import OUTCOME_FAILED, OUTCOME_PLAYED
+
+if TYPE_CHECKING:
+    from backend.config import ConfigManager
+    from backend.services import ChromecastScanner, MawaqitClient, RunHistory, RunLogArchive
+    from backend.services.chromecast_scanner import PreparedGroup
+
+logger = logging.getLogger(__name__)
+
+# The timer thread wakes up at least this often to notice wall-clock adjustments
+MAX_SLEEP_SECONDS = 30
+
+# A prayer whose time passed less than this long ago (e.g. during a restart) still fires
+MISSED_GRACE_SECONDS = 60
+
+# Wall-clock drift relative to the monotonic clock that triggers recomputing deadlines
+CLOCK_DRIFT_TOLERANCE_SECONDS = 1.0
+
+# The next day's times are loaded shortly after midnight
+ROLLOVER_TIME = "00:01"
+
+ROLLOVER_KEY = "reschedule"
+
+# Seconds before each prayer at which the Chromecast is resolved, connected and set up
+DEFAULT_WARMUP_LEAD_SECONDS = 30
+
+# How long the play step waits for a warm-up that is still running at T+0
+WARMUP_JOIN_TIMEOUT_SECONDS = 25
+
+# How often followers of a prayer's log check for new lines
+LOG_FOLLOW_POLL_SECONDS = 0.5
+
+ACTION_PLAY = "play"
+ACTION_WARMUP = "warmup"
+ACTION_ROLLOVER = "rollover"
+
+
+class ScheduledPrayer:
+    """A timer heap entry: what to do for which prayer, at which local wall-clock time"""
+
+    __slots__ = ("prayer_key", "at", "chromecast_name", "action")
+
+    def __init__(self, prayer_key: str, at: datetime, chromecast_name: Optional[str], action: str = ACTION_PLAY):
+        self.prayer_key = prayer_key
+        self.at = at
+        self.chromecast_name = chromecast_name
+        self.action = action
+
+
+class PrayerScheduler:
+    """Fires adhans from a timer heap inside the backend process.
+
+    Deadlines are kept on the monotonic clock, so a prayer fires within the timer
+    thread's wake-up latency instead of on cron's one-minute grid, and without
+    starting a new interpreter. WARMUP_LEAD_SECONDS before each prayer the device
+    is resolved, connected and its volume set, so at T+0 only the play command is
+    sent. Shortly after midnight the next day's times are loaded from the stored
+    calendar, so no crontab or reschedule job is needed.
+
+    Exposes the same scheduling methods as CronManager so the routes can use either.
+    """
+
+    def __init__(self, chromecast_scanner: "ChromecastScanner", config_manager: "ConfigManager",
+                 mawaqit_client: "MawaqitClient", upload_folder: str, max_log_lines: int = 200,
+                 warmup_lead: Optional[float] = None, run_history: Optional["RunHistory"] = None,
+                 run_logs: Optional["RunLogArchive"] = None):
+        if warmup_lead is None:
+            warmup_lead = float(os.environ.get("WARMUP_LEAD_SECONDS", DEFAULT_WARMUP_LEAD_SECONDS))
+        self.chromecast_scanner = chromecast_scanner
+        self.config_manager = config_manager
+        self.mawaqit_client = mawaqit_client
+        self.upload_folder = upload_folder
+        self.warmup_lead = warmup_lead
+        self.run_history = run_history
+        self.run_logs = run_logs
+
+        self._condition = threading.Condition()
+        self._heap: List[Tuple[float, int, ScheduledPrayer]] = []
+        self._sequence = itertools.count()
+        self._prayer_times: Dict[str, str] = {}
+        self._chromecast_name: Optional[str] = None
+        self._clock_offset = time.time() - time.monotonic()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="prayer-scheduler")
+        # Submitted warm-ups by prayer, with the entry they were started for
+        self._warmups: Dict[str, Tuple[ScheduledPrayer, Future]] = {}
+
+        self._last_runs: Dict[str, datetime] = {}
+        self._timings: Dict[str, Dict[str, float]] = {}
+        # Log lines are numbered so followers can tell which ones they have seen
+        self._logs: Dict[str, Deque[Tuple[int, str]]] = {}
+        self._log_sequence = itertools.count(1)
+        self.max_log_lines = max_log_lines
+
+    def start(self):
+        """Start the timer thread (idempotent)"""
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="prayer-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the timer thread; already dispatched plays are left to finish"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _deadline_for(self, at: datetime) -> float:
+        """Convert a local wall-clock time to a monotonic deadline"""
+        return time.monotonic() + (at - datetime.now()).total_seconds()
+
+    def _push_locked(self, entry: ScheduledPrayer):
+        heapq.heappush(self._heap, (self._deadline_for(entry.at), next(self._sequence), entry))
+
+    def _rebuild_locked(self, day: Optional[date] = None):
+        """Recompute the heap for the remaining prayers of a day plus the next rollover"""
+        now = datetime.now()
+        if day is None:
+            day = now.date()
+
+        self._heap = []
+        kept_warmups = set()
+        for prayer_key, time_str in self._prayer_times.items():
+            if not time_str:
+                continue
+            try:
+                hour, minute = divmod(parse_time(time_str), 60)
+            except ValueError as e:
+                logger.error(f"Error scheduling {prayer_key}: {e}")
+                continue
+            at = datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+            if (now - at).total_seconds() <= MISSED_GRACE_SECONDS:
+                self._push_locked(ScheduledPrayer(prayer_key, at, self._chromecast_name))
+                warmup_at = at - timedelta(seconds=self.warmup_lead)
+                warmup = self._warmups.get(prayer_key)
+                if warmup is not None and warmup[0].at == warmup_at and warmup[0].chromecast_name == self._chromecast_name:
+                    # Already started (or done) for this very prayer: keep it instead of warming up again
+                    kept_warmups.add(prayer_key)
+                elif self.warmup_lead > 0:
+                    # A warm-up that is already due runs right away
+                    self._push_locked(ScheduledPrayer(prayer_key, warmup_at, self._chromecast_name, ACTION_WARMUP))
+
+        # Warm-ups of prayers that were removed or moved are not going to be played
+        for prayer_key in list(self._warmups):
+            if prayer_key not in kept_warmups:
+                self._discard_warmup_locked(prayer_key)
+
+        hour, minute = divmod(parse_time(ROLLOVER_TIME), 60)
+        rollover_at = datetime.combine(day + timedelta(days=1), datetime.min.time()).replace(hour=hour, minute=minute)
+        self._push_locked(ScheduledPrayer(ROLLOVER_KEY, rollover_at, None, ACTION_ROLLOVER))
+
+        self._clock_offset = time.time() - time.monotonic()
+        self._condition.notify_all()
+
+    def _discard_warmup_locked(self, prayer_key: str):
+        """Forget a prayer's warm-up and release its devices once it has finished"""
+        warmup = self._warmups.pop(prayer_key, None)
+        if warmup is None:
+            return
+
+        def release(future: Future):
+            try:
+                group = future.result()
+            except Exception:
+                return
+            if group is not None:
+                self.chromecast_scanner.release_group(group)
+
+        warmup[1].add_done_callback(release)
+
+    def schedule_prayers(self, prayer_times: Dict[str, str], chromecast_name: str):
+        """Schedule today's remaining prayers (replaces the current schedule)"""
+        with self._condition:
+            self._prayer_times = {key: value for key, value in prayer_times.items() if value}
+            self._chromecast_name = chromecast_name
+            self._rebuild_locked()
+        self.start()
+        return True
+
+    def clear_all_jobs(self):
+        """Remove all scheduled prayers (the rollover stays)"""
+        with self._condition:
+            self._prayer_times = {}
+            self._rebuild_locked()
+
+    def remove_job(self, prayer_key: str) -> bool:
+        """Remove a specific prayer from today's schedule"""
+        with self._condition:
+            if prayer_key not in self._prayer_times:
+                return False
+            del self._prayer_times[prayer_key]
+            self._rebuild_locked()
+            return True
+
+    def get_scheduled_jobs(self, include_upcoming: bool = False) -> List[Dict]:
+        """Get the scheduled prayers, in the same shape as CronManager.get_scheduled_jobs.
+
+        Only today is ever scheduled, so `include_upcoming` has nothing to add.
+        """
+        today = datetime.now().date()
+        with self._condition:
+            prayer_times = dict(self._prayer_times)
+            last_runs = dict(self._last_runs)
+
+        jobs = []
+        for prayer_key, planned_time in prayer_times.items():
+            try:
+                hour, minute = divmod(parse_time(planned_time), 60)
+            except ValueError:
+                # Skipped by _rebuild_locked too, so it is not scheduled
+                continue
+            last_run = last_runs.get(prayer_key)
+            with self._condition:
+                timings = dict(self._timings.get(prayer_key, {}))
+            jobs.append({
+                "prayer": prayer_key,
+                "schedule": f"{minute} {hour} * * *",
+                "planned_time": planned_time,
+                "command": "in-process scheduler",
+                "last_run": last_run.isoformat() if last_run else None,
+                "executed_today": bool(last_run and last_run.date() == today),
+                "date": today.isoformat(),
+                "timings": timings,
+            })
+        return jobs
+
+    def get_stats(self) -> Dict:
+        """Get scheduler counters, in the same shape as CronManager.get_stats"""
+        with self._condition:
+            return {"backend": "inprocess", "pending_entries": len(self._heap), "warmups_in_flight": len(self._warmups)}
+
+    def get_job_logs(self, prayer_key: str, max_lines: int = 100) -> Optional[str]:
+        """Get the log lines of the last run of a prayer"""
+        with self._condition:
+            lines = self._logs.get(prayer_key)
+            if lines is None:
+                return None
+            return "\n".join(text for _, text in list(lines)[-max_lines:])
+
+    def follow_job_logs(self, prayer_key: str, max_lines: int = 100,
+                        timeout: Optional[float] = None) -> Iterator[Optional[str]]:
+        """Yield the last max_lines log lines of a prayer, then new lines as they are logged.
+
+        Yields None when there is nothing new, like CronManager.follow_job_logs.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        last_seen = 0
+        first = True
+        while deadline is None or time.monotonic() < deadline:
+            with self._condition:
+                lines = [line for line in self._logs.get(prayer_key, ()) if line[0] > last_seen]
+            if first:
+                lines, first = lines[-max_lines:], False
+            for sequence, text in lines:
+                last_seen = sequence
+                yield f"{text}\n"
+            if not lines:
+                yield None
+                time.sleep(LOG_FOLLOW_POLL_SECONDS)
+
+    def _log(self, prayer_key: str, message: str, new_run: bool = False):
+        logger.info(f"[{prayer_key}] {message}")
+        with self._condition:
+            if new_run or prayer_key not in self._logs:
+                self._logs[prayer_key] = deque(maxlen=self.max_log_lines)
+            line = f"{datetime.now().isoformat(timespec='milliseconds')} {message}"
+            self._logs[prayer_key].append((next(self._log_sequence), line))
+
+    def _run(self):
+        """Timer thread: pop due entries and hand them to the worker pool"""
+        with self._condition:
+            while not self._stopped:
+                drift = (time.time() - time.monotonic()) - self._clock_offset
+                if abs(drift) > CLOCK_DRIFT_TOLERANCE_SECONDS:
+                    logger.info(f"Wall clock moved by {drift:.1f}s, recomputing deadlines")
+                    entries = [entry for _, _, entry in self._heap]
+                    self._heap = []
+                    for entry in entries:
+                        self._push_locked(entry)
+                    self._clock_offset = time.time() - time.monotonic()
+
+                if not self._heap:
+                    self._condition.wait(MAX_SLEEP_SECONDS)
+                    continue
+
+                deadline, _, entry = self._heap[0]
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(min(remaining, MAX_SLEEP_SECONDS))
+                    continue
+
+                heapq.heappop(self._heap)
+                if entry.action == ACTION_WARMUP:
+                    self._discard_warmup_locked(entry.prayer_key)
+                    self._warmups[entry.prayer_key] = (entry, self._executor.submit(self._warm_up, entry))
+                else:
+                    self._executor.submit(self._dispatch, entry, deadline)
+
+    def _dispatch(self, entry: ScheduledPrayer, deadline: float):
+        try:
+            if entry.action == ACTION_ROLLOVER:
+                self._roll_over()
+            else:
+                self._play(entry, deadline)
+        except Exception as e:
+            logger.error(f"Error running scheduled {entry.prayer_key}: {e}", exc_info=True)
+
+    def _get_targets(self, entry: ScheduledPrayer) -> List[str]:
+        return self.config_manager.get_chromecast_targets(entry.prayer_key, entry.chromecast_name)
+
+    def _warm_up(self, entry: ScheduledPrayer):
+        """Resolve and connect to the devices ahead of a prayer; returns a PreparedGroup or None"""
+        prayer_key = entry.prayer_key
+        targets = self._get_targets(entry)
+        self._log(prayer_key, f"Warming up {', '.join(targets)} for {prayer_key} "
+                              f"at {entry.at.strftime('%H:%M:%S')}", new_run=True)
+        volume = self.config_manager.load().get("adhan_volumes", {}).get(prayer_key)
+        try:
+            group = self.chromecast_scanner.prepare_group(targets, volume=volume)
+        except Exception as e:
+            logger.error(f"Error warming up for {prayer_key}: {e}", exc_info=True)
+            group = None
+        if group and group.casts:
+            self._log(prayer_key, f"Warm-up done in {group.timings.get('warmup_seconds')}s "
+                                  f"({len(group.casts)}/{len(targets)} devices)")
+            for error in group.errors.values():
+                self._log(prayer_key, error)
+            return group
+        self._log(prayer_key, "Warm-up failed, will retry at prayer time")
+        return None
+
+    def _play(self, entry: ScheduledPrayer, deadline: float):
+        """Play the adhan of a prayer (same steps as scripts/play_adhan.py)"""
+        prayer_key = entry.prayer_key
+        started = datetime.now()
+        with self._condition:
+            self._last_runs[prayer_key] = started
+            warmup = self._warmups.pop(prayer_key, (None, None))[1]
+        self._log(prayer_key, f"Firing {prayer_key} planned at {entry.at.strftime('%H:%M')} "
+                              f"({(started - entry.at).total_seconds():.3f}s after)", new_run=warmup is None)
+
+        group = None
+        if warmup is not None:
+            try:
+                group = warmup.result(timeout=WARMUP_JOIN_TIMEOUT_SECONDS)
+            except Exception as e:
+                self._log(prayer_key, f"Warm-up unavailable: {e}")
+
+        results, error = self._start_playback(entry, deadline, group)
+        devices = results.get("devices", {})
+        for name, result in devices.items():
+            self._log(prayer_key, f"{name}: {'played' if result['played'] else result['error']}, "
+                                  f"timings: {result['timings']}")
+        if len(devices) > 1:
+            self._log(prayer_key, f"Start skew: {results['start_skew_seconds']}s "
+                                  f"(commands: {results['command_skew_seconds']}s)")
+        if devices:
+            with self._condition:
+                self._timings[prayer_key] = get_group_timings(results)
+
+        played = [name for name, result in devices.items() if result["played"]]
+        if played:
+            self._log(prayer_key, f"Successfully started playing {prayer_key} adhan on {', '.join(played)}")
+        if error is not None:
+            self._log(prayer_key, error)
+        if self.run_history is not None:
+            # One row per device
+            for name, result in (devices or {entry.chromecast_name: {"played": False, "error": error, "timings": {}}}).items():
+                self.run_history.record(
+                    prayer_key, "inprocess", OUTCOME_PLAYED if result["played"] else OUTCOME_FAILED,
+                    chromecast_name=name, scheduled_at=entry.at, process_started_at=started,
+                    timings=result["timings"], error=result["error"],
+                )
+        if self.run_logs is not None:
+            with self._condition:
+                text = "".join(f"{line}\n" for _, line in self._logs.get(prayer_key, ()))
+            self.run_logs.add_run(prayer_key, text.encode("utf-8"), OUTCOME_PLAYED if played else OUTCOME_FAILED,
+                                  started_at=started.timestamp())
+
+    def _start_playback(self, entry: ScheduledPrayer, deadline: float,
+                        group: Optional["PreparedGroup"]) -> Tuple[Dict, Optional[str]]:
+        """Resolve the adhan file and play it on the prayer's devices.
+
+        Returns the results of ChromecastScanner.play_group ({} if nothing was played)
+        and an error message (None if every device played).
+        """
+        prayer_key = entry.prayer_key
+        config = self.config_manager.load()
+        adhan_file = config.get("adhan_files", {}).get(prayer_key)
+        filename = Path(adhan_file).name if adhan_file else None
+        if not adhan_file or not os.path.exists(os.path.join(self.upload_folder, filename)):
+            if group:
+                self.chromecast_scanner.release_group(group)
+            if not adhan_file:
+                return {}, f"No adhan file configured for {prayer_key}"
+            return {}, f"Adhan file not found: {filename}"
+
+        targets = self._get_targets(entry)
+        if not targets:
+            if group:
+                self.chromecast_scanner.release_group(group)
+            return {}, f"No chromecast configured for {prayer_key}"
+        volume = config.get("adhan_volumes", {}).get(prayer_key)
+        media_url = get_media_url(filename)
+        self._log(prayer_key, f"Attempting to play {prayer_key} adhan on {', '.join(targets)}")
+        self._log(prayer_key, f"Media URL: {media_url}")
+
+        if group is None:
+            # No (successful) warm-up: resolve and connect now
+            group = self.chromecast_scanner.prepare_group(targets, volume=volume)
+        results = self.chromecast_scanner.play_group(group, media_url, deadline=deadline)
+        errors = [result["error"] for result in results["devices"].values() if not result["played"]]
+        return results, "; ".join(errors) if errors else None
+
+    def _roll_over(self):
+        """Load the new day's prayer times from the stored calendar and reschedule"""
+        today = datetime.now().date()
+        self._log(ROLLOVER_KEY, f"Loading prayer times for {today.isoformat()}", new_run=True)
+        with self._condition:
+            self._last_runs[ROLLOVER_KEY] = datetime.now()
+
+        config = self.config_manager.load()
+        mosque = config.get("mosque") or {}
+        transformed_times = None
+        if mosque.get("uuid"):
+            # Served from the stored calendar unless it is stale
+            asyncio.run(self.mawaqit_client.get_prayer_times(mosque["uuid"]))
+            calendar = self.mawaqit_client.calendar_store.get_calendar(mosque["uuid"])
+            if calendar:
+                transformed_times = calendar.times_for(today, include_shuruq=False) or None
+
+        with self._condition:
+            if transformed_times:
+                self._prayer_times = transformed_times
+            else:
+                self._log(ROLLOVER_KEY, "No calendar for today, keeping the previous times")
+            self._rebuild_locked(today)
+            prayer_times = dict(self._prayer_times)
+
+        if transformed_times:
+            from backend.utils import get_prayer_schedule_date
+            self.config_manager.update({
+                "prayer_times": transformed_times,
+                "prayer_schedule_date": get_prayer_schedule_date()
+            })
+        self._log(ROLLOVER_KEY, f"Scheduled prayer times: {prayer_times}")
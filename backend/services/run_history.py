@@ -0,0 +1,164 @@
+"""Append-only history of adhan plays (SQLite under CONFIG_DIR)"""
+import json
+import os
+import sqlite3
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DB_NAME = "run_history.db"
+
+OUTCOME_PLAYED = "played"
+OUTCOME_FAILED = "failed"
+OUTCOME_CANCELLED = "cancelled"
+
+# Percentiles reported for the lag between the planned time and playback
+LAG_PERCENTILES = (50, 95, 99)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prayer TEXT NOT NULL,
+    source TEXT NOT NULL,
+    chromecast_name TEXT,
+    scheduled_at REAL,
+    process_started_at REAL,
+    discovery_seconds REAL,
+    connect_seconds REAL,
+    playing_at REAL,
+    outcome TEXT NOT NULL,
+    error TEXT,
+    timings TEXT,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_prayer_scheduled ON runs (prayer, scheduled_at);
+"""
+
+Timestamp = Union[float, datetime, None]
+
+
+def _to_epoch(value: Timestamp) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(int(-(-p * len(ordered) // 100)), 1)  # ceil(p/100 * n)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class RunHistory:
+    """Records every play attempt with its timings, from any process.
+
+    Each call opens its own connection, so the store can be shared by the
+    backend threads and the play_adhan.py processes started by cron. Rows are
+    never updated: one row per attempt, written once it finished.
+    """
+
+    def __init__(self, config_dir: str = None):
+        if config_dir is None:
+            from backend.config import ConfigManager
+            config_dir = ConfigManager().config_dir
+        self.db_path = os.path.join(config_dir, DB_NAME)
+        self._initialized = False
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        if not self._initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            self._initialized = True
+        return connection
+
+    def record(self, prayer: str, source: str, outcome: str, chromecast_name: Optional[str] = None,
+               scheduled_at: Timestamp = None, process_started_at: Timestamp = None,
+               timings: Optional[Dict[str, float]] = None, error: Optional[str] = None) -> Optional[int]:
+        """Append a play attempt; returns its id (None if it could not be stored).
+
+        `timings` is the dict filled by ChromecastScanner.prepare/play_prepared;
+        discovery, connect and PLAYING times are taken from it.
+        """
+        timings = dict(timings or {})
+        row = (
+            prayer, source, chromecast_name, _to_epoch(scheduled_at), _to_epoch(process_started_at),
+            timings.get("discovery_seconds"), timings.get("connect_seconds"), timings.get("playing_at"),
+            outcome, error, json.dumps(timings), time.time(),
+        )
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            connection = self._connect()
+            try:
+                with connection:
+                    cursor = connection.execute(
+                        "INSERT INTO runs (prayer, source, chromecast_name, scheduled_at, process_started_at,"
+                        " discovery_seconds, connect_seconds, playing_at, outcome, error, timings, recorded_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        row,
+                    )
+                return cursor.lastrowid
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            logger.error(f"Error recording run of {prayer}: {e}")
+            return None
+
+    def get_runs(self, prayer: Optional[str] = None, since: Optional[float] = None,
+                 limit: int = 100) -> List[Dict[str, Any]]:
+        """Get the most recent runs, newest first"""
+        query = "SELECT * FROM runs"
+        conditions, params = [], []
+        if prayer:
+            conditions.append("prayer = ?")
+            params.append(prayer)
+        if since is not None:
+            conditions.append("recorded_at >= ?")
+            params.append(since)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        if not os.path.exists(self.db_path):
+            return []
+        connection = self._connect()
+        try:
+            rows = connection.execute(query, params).fetchall()
+        finally:
+            connection.close()
+        return [self._row_to_dict(row) for row in rows]
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        run = dict(row)
+        run["timings"] = json.loads(run["timings"]) if run["timings"] else {}
+        run["lag_seconds"] = (
+            round(run["playing_at"] - run["scheduled_at"], 3)
+            if run["playing_at"] is not None and run["scheduled_at"] is not None else None
+        )
+        for key in ("scheduled_at", "process_started_at", "playing_at", "recorded_at"):
+            if run[key] is not None:
+                run[key] = datetime.fromtimestamp(run[key]).isoformat(timespec="milliseconds")
+        return run
+
+    @staticmethod
+    def get_lag_stats(runs: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Summarize the lag between planned time and playback of runs (as returned by get_runs)"""
+        runs = list(runs)
+        lags = [run["lag_seconds"] for run in runs if run["lag_seconds"] is not None]
+        stats: Dict[str, Any] = {
+            "runs": len(runs),
+            "played": sum(1 for run in runs if run["outcome"] == OUTCOME_PLAYED),
+            "failed": sum(1 for run in runs if run["outcome"] == OUTCOME_FAILED),
+        }
+        for p in LAG_PERCENTILES:
+            stats[f"p{p}_lag_seconds"] = percentile(lags, p)
+        return stats
@@ -0,0 +1,232 @@
+"""Per-run archive of job logs with retention and an index for queries"""
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from backend.services.run_history import OUTCOME_FAILED, OUTCOME_PLAYED
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "index.db"
+
+# Runs kept per prayer, by count and by age
+DEFAULT_KEEP_RUNS = 60
+DEFAULT_KEEP_DAYS = 30
+
+# The most recent runs of each prayer stay uncompressed, older ones are gzipped
+DEFAULT_UNCOMPRESSED_RUNS = 1
+
+# First line printed by play_adhan.py, used as the run's start time
+RUN_STARTED_PATTERN = re.compile(r"^Run started at (\S+)")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prayer TEXT NOT NULL,
+    path TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    compressed INTEGER NOT NULL DEFAULT 0,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    exit_code INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_prayer_started ON runs (prayer, started_at);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started_at);
+"""
+
+
+class RunLogArchive:
+    """Keeps the log of every job run as its own segment under LOG_DIR/runs.
+
+    Segments live in one directory per prayer and are named after their run id;
+    the index (SQLite) maps run ids to their file, (uncompressed) length,
+    timestamps and outcome, so runs can be listed and filtered without opening
+    any log.
+    Retention by count and age and compression of older segments are applied
+    each time a run is added.
+    """
+
+    def __init__(self, log_dir: str = None, keep_runs: Optional[int] = None,
+                 keep_days: Optional[float] = None, uncompressed_runs: Optional[int] = None):
+        if log_dir is None:
+            log_dir = os.environ.get("LOG_DIR", "/var/log")
+        if keep_runs is None:
+            keep_runs = int(os.environ.get("RUN_LOG_KEEP_RUNS", DEFAULT_KEEP_RUNS))
+        if keep_days is None:
+            keep_days = float(os.environ.get("RUN_LOG_KEEP_DAYS", DEFAULT_KEEP_DAYS))
+        if uncompressed_runs is None:
+            uncompressed_runs = int(os.environ.get("RUN_LOG_UNCOMPRESSED_RUNS", DEFAULT_UNCOMPRESSED_RUNS))
+
+        self.archive_dir = os.path.join(log_dir, "runs")
+        self.index_path = os.path.join(self.archive_dir, INDEX_NAME)
+        self.keep_runs = keep_runs
+        self.keep_days = keep_days
+        self.uncompressed_runs = uncompressed_runs
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        connection = sqlite3.connect(self.index_path, timeout=10)
+        connection.row_factory = sqlite3.Row
+        connection.executescript(_SCHEMA)
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(runs)")}
+        if "offset" in columns:
+            # Always 0 in indexes written by earlier versions
+            connection.execute("ALTER TABLE runs DROP COLUMN offset")
+        return connection
+
+    def _get_prayer_dir(self, prayer: str) -> str:
+        safe_prayer = re.sub(r"[^A-Za-z0-9_-]", "_", prayer)
+        return os.path.join(self.archive_dir, safe_prayer)
+
+    def add_run(self, prayer: str, content: bytes, outcome: str, started_at: Optional[float] = None,
+                finished_at: Optional[float] = None, exit_code: Optional[int] = None) -> int:
+        """Store the log of a finished run and return its id"""
+        if finished_at is None:
+            finished_at = time.time()
+        if started_at is None:
+            started_at = finished_at
+
+        prayer_dir = self._get_prayer_dir(prayer)
+        os.makedirs(prayer_dir, exist_ok=True)
+        stamp = datetime.fromtimestamp(started_at).strftime("%Y%m%d-%H%M%S")
+
+        connection = self._connect()
+        try:
+            # The row is rolled back if the segment cannot be written
+            with connection:
+                cursor = connection.execute(
+                    "INSERT INTO runs (prayer, path, length, started_at, finished_at, outcome, exit_code)"
+                    " VALUES (?, '', ?, ?, ?, ?, ?)",
+                    (prayer, len(content), started_at, finished_at, outcome, exit_code),
+                )
+                run_id = cursor.lastrowid
+                # Named after the run id: runs started in the same second get their own file
+                path = os.path.join(prayer_dir, f"{stamp}-{run_id}.log")
+                with open(path, "wb") as f:
+                    f.write(content)
+                connection.execute("UPDATE runs SET path = ? WHERE id = ?",
+                                   (os.path.relpath(path, self.archive_dir), run_id))
+            self._apply_retention(connection, prayer)
+        finally:
+            connection.close()
+        return run_id
+
+    def add_log_file(self, prayer: str, log_file: str, exit_code: int) -> Optional[int]:
+        """Archive the log a cron job just wrote (its first line may carry the start time)"""
+        try:
+            with open(log_file, "rb") as f:
+                content = f.read()
+            finished_at = os.path.getmtime(log_file)
+        except OSError as e:
+            logger.error(f"Error reading {log_file}: {e}")
+            return None
+
+        started_at = None
+        first_line = content.split(b"\n", 1)[0].decode("utf-8", errors="replace")
+        match = RUN_STARTED_PATTERN.match(first_line)
+        if match:
+            try:
+                started_at = datetime.fromisoformat(match.group(1)).timestamp()
+            except ValueError:
+                pass
+
+        outcome = OUTCOME_PLAYED if exit_code == 0 else OUTCOME_FAILED
+        return self.add_run(prayer, content, outcome, started_at, finished_at, exit_code)
+
+    def _apply_retention(self, connection: sqlite3.Connection, prayer: str):
+        """Delete runs beyond the count/age limits and compress the older remaining ones"""
+        rows = connection.execute(
+            "SELECT id, path, compressed, started_at FROM runs WHERE prayer = ? ORDER BY started_at DESC, id DESC",
+            (prayer,),
+        ).fetchall()
+        oldest_allowed = time.time() - self.keep_days * 86400
+
+        for position, row in enumerate(rows):
+            path = os.path.join(self.archive_dir, row["path"])
+            if position >= self.keep_runs or row["started_at"] < oldest_allowed:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                with connection:
+                    connection.execute("DELETE FROM runs WHERE id = ?", (row["id"],))
+            elif position >= self.uncompressed_runs and not row["compressed"]:
+                compressed_path = f"{path}.gz"
+                try:
+                    with open(path, "rb") as source, gzip.open(compressed_path, "wb") as target:
+                        shutil.copyfileobj(source, target)
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Error compressing {path}: {e}")
+                    continue
+                with connection:
+                    connection.execute(
+                        "UPDATE runs SET path = ?, compressed = 1 WHERE id = ?",
+                        (f"{row['path']}.gz", row["id"]),
+                    )
+
+    def query(self, prayer: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None,
+              outcome: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """List runs (newest first) from the index, filtered by prayer, start time range and outcome"""
+        if not os.path.exists(self.index_path):
+            return []
+        conditions, params = [], []
+        if prayer:
+            conditions.append("prayer = ?")
+            params.append(prayer)
+        if start is not None:
+            conditions.append("started_at >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("started_at < ?")
+            params.append(end)
+        if outcome:
+            conditions.append("outcome = ?")
+            params.append(outcome)
+        query = "SELECT * FROM runs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+
+        connection = self._connect()
+        try:
+            rows = connection.execute(query, params).fetchall()
+        finally:
+            connection.close()
+
+        runs = []
+        for row in rows:
+            run = dict(row)
+            run["compressed"] = bool(run["compressed"])
+            run["started_at"] = datetime.fromtimestamp(run["started_at"]).isoformat(timespec="seconds")
+            run["finished_at"] = datetime.fromtimestamp(run["finished_at"]).isoformat(timespec="seconds")
+            runs.append(run)
+        return runs
+
+    def read_run(self, run_id: int) -> Optional[str]:
+        """Get the log of one run, or None if it is unknown or was removed"""
+        if not os.path.exists(self.index_path):
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute("SELECT * FROM runs WHERE id = ?", (run_id,)).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+
+        path = os.path.join(self.archive_dir, row["path"])
+        opener = gzip.open if row["compressed"] else open
+        try:
+            with opener(path, "rb") as f:
+                return f.read().decode("utf-8", errors="replace")
+        except OSError:
+            return None
@@ -1,8 +1,23 @@
-"""Utility functions"""
-from .prayer_times import extract_prayer_times_from_calendar, transform_prayer_times
-from .file_utils import allowed_file
-from .date_utils import get_prayer_schedule_date
-from .network_utils import get_local_ip
+"""Utility functions (imported on first use, see lazy_import)"""
+from typing import TYPE_CHECKING
 
-__all__ = ['extract_prayer_times_from_calendar', 'transform_prayer_times', 'allowed_file', 'get_prayer_schedule_date', 'get_local_ip']
+from .lazy_import import lazy_exports
 
+if TYPE_CHECKING:
+    from .prayer_calendar import PrayerCalendar, PrayerCalendarError
+    from .prayer_times import extract_prayer_times_from_calendar, transform_prayer_times
+    from .file_utils import allowed_file
+    from .date_utils import get_prayer_schedule_date
+    from .network_utils import get_local_ip
+
+__getattr__, __dir__ = lazy_exports(__name__, {
+    'PrayerCalendar': 'prayer_calendar',
+    'PrayerCalendarError': 'prayer_calendar',
+    'extract_prayer_times_from_calendar': 'prayer_times',
+    'transform_prayer_times': 'prayer_times',
+    'allowed_file': 'file_utils',
+    'get_prayer_schedule_date': 'date_utils',
+    'get_local_ip': 'network_utils',
+})
+
+__all__ = ['PrayerCalendar', 'PrayerCalendarError', 'extract_prayer_times_from_calendar', 'transform_prayer_times', 'allowed_file', 'get_prayer_schedule_date', 'get_local_ip']
@@ -1,10 +1,118 @@
 """Date utility functions for Gregorian and Hijri dates"""
+from bisect import bisect_right
 from datetime import datetime, date, timedelta
-from typing import Dict, List, Tuple, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple, Optional
 from hijridate import convert
 from zoneinfo import ZoneInfo
 
 
+# Hijri month names in Arabic
+HIJRI_MONTHS = (
+    "محرم", "صفر", "ربيع الأول", "ربيع الثاني", "جمادى الأولى", "جمادى الثانية",
+    "رجب", "شعبان", "رمضان", "شوال", "ذو القعدة", "ذو الحجة"
+)
+
+# Day names in Arabic (0 = Monday, 6 = Sunday)
+ARABIC_DAY_NAMES = (
+    "الاثنين", "الثلاثاء", "الأربعاء", "الخميس", "الجمعة", "السبت", "الأحد"
+)
+
+HIJRI_UNAVAILABLE = "تاريخ غير متاح"
+
+# (gregorian label, hijri day, hijri month, hijri year, hijri label); Hijri parts are None when unavailable
+DateTableRow = Tuple[str, Optional[int], Optional[int], Optional[int], str]
+
+
+def _format_hijri(target_date: date, hijri_day: int, hijri_month: int, hijri_year: int) -> str:
+    # Format Hijri date (e.g., "الاثنين، 5 جمادى الأولى 1445")
+    day_name_ar = ARABIC_DAY_NAMES[target_date.weekday()]
+    return f"{day_name_ar}، {hijri_day} {HIJRI_MONTHS[hijri_month - 1]} {hijri_year}"
+
+
+def _build_row(target_date: date, hijri: Optional[Tuple[int, int, int]]) -> DateTableRow:
+    # Format Gregorian date (e.g., "Monday, January 15, 2024")
+    gregorian = target_date.strftime("%A, %B %d, %Y")
+    if hijri is None:
+        return gregorian, None, None, None, HIJRI_UNAVAILABLE
+    hijri_year, hijri_month, hijri_day = hijri
+    return gregorian, hijri_day, hijri_month, hijri_year, _format_hijri(target_date, hijri_day, hijri_month, hijri_year)
+
+
+def _convert_to_hijri(target_date: date) -> Optional[Tuple[int, int, int]]:
+    """Convert one date to (year, month, day) in Hijri, or None outside the supported range"""
+    try:
+        hijri_date = convert.Gregorian(target_date.year, target_date.month, target_date.day).to_hijri()
+        return hijri_date.year, hijri_date.month, hijri_date.day
+    except Exception as e:
+        # Fallback if conversion fails
+        print(f"Error converting to Hijri: {e}")
+        return None
+
+
+@lru_cache(maxsize=4)
+def _get_date_table(year: int) -> Tuple[DateTableRow, ...]:
+    """
+    Build the labels of every day of a year.
+    
+    Only Jan 1 goes through a full Hijri conversion; the following days are
+    derived by counting days within the Hijri months (one month-length lookup
+    per Hijri month).
+    """
+    rows = []
+    current = date(year, 1, 1)
+    hijri = _convert_to_hijri(current)
+    month_length = None
+    if hijri is not None and _convert_to_hijri(date(year, 12, 31)) is None:
+        # The year leaves the supported range, only per-day conversion knows where
+        hijri = None
+    
+    while current.year == year:
+        if hijri is None:
+            # At the edges of the supported range, convert day by day
+            rows.append(_build_row(current, _convert_to_hijri(current)))
+        else:
+            rows.append(_build_row(current, hijri))
+            hijri_year, hijri_month, hijri_day = hijri
+            if month_length is None:
+                month_length = convert.Hijri(hijri_year, hijri_month, 1).month_length()
+            if hijri_day < month_length:
+                hijri = (hijri_year, hijri_month, hijri_day + 1)
+            else:
+                month_length = None
+                hijri = (hijri_year + 1, 1, 1) if hijri_month == 12 else (hijri_year, hijri_month + 1, 1)
+        current += timedelta(days=1)
+    
+    return tuple(rows)
+
+
+def format_dates(start: date, end: date) -> List[Dict[str, Any]]:
+    """
+    Format every date from start to end (inclusive) in both Gregorian and Hijri.
+    
+    Returns:
+        List of dicts with 'date', 'gregorian', 'hijri', 'hijri_day', 'hijri_month' and 'hijri_year'
+    """
+    formatted = []
+    current = start
+    while current <= end:
+        table = _get_date_table(current.year)
+        last = min(end, date(current.year, 12, 31))
+        first_index = current.timetuple().tm_yday - 1
+        for offset, row in enumerate(table[first_index:last.timetuple().tm_yday]):
+            gregorian, hijri_day, hijri_month, hijri_year, hijri = row
+            formatted.append({
+                "date": current + timedelta(days=offset),
+                "gregorian": gregorian,
+                "hijri": hijri,
+                "hijri_day": hijri_day,
+                "hijri_month": hijri_month,
+                "hijri_year": hijri_year,
+            })
+        current = last + timedelta(days=1)
+    return formatted
+
+
 def format_date_both_calendars(target_date: date) -> Dict[str, str]:
     """
     Format a specific date in both Gregorian and Hijri formats.
@@ -15,41 +123,10 @@ def format_date_both_calendars(target_date: date) -> Dict[str, str]:
     Returns:
         Dict with 'gregorian' and 'hijri' keys containing formatted date strings
     """
-    # Format Gregorian date (e.g., "Monday, January 15, 2024")
-    gregorian = target_date.strftime("%A, %B %d, %Y")
-    
-    # Convert to Hijri
-    try:
-        hijri_date = convert.Gregorian(target_date.year, target_date.month, target_date.day).to_hijri()
-        
-        # Hijri month names in Arabic
-        hijri_months = [
-            "محرم", "صفر", "ربيع الأول", "ربيع الثاني", "جمادى الأولى", "جمادى الثانية",
-            "رجب", "شعبان", "رمضان", "شوال", "ذو القعدة", "ذو الحجة"
-        ]
-        
-        # Day names in Arabic
-        hijri_days = [
-            "الاثنين", "الثلاثاء", "الأربعاء", "الخميس", "الجمعة", "السبت", "الأحد"
-        ]
-        
-        # Get day of week (0 = Monday, 6 = Sunday)
-        day_of_week = target_date.weekday()
-        day_name_ar = hijri_days[day_of_week]
-        
-        month_name_ar = hijri_months[hijri_date.month - 1]
-        
-        # Format Hijri date (e.g., "الاثنين، 5 جمادى الأولى 1445")
-        hijri = f"{day_name_ar}، {hijri_date.day} {month_name_ar} {hijri_date.year}"
-        
-    except Exception as e:
-        # Fallback if conversion fails
-        print(f"Error converting to Hijri: {e}")
-        hijri = "تاريخ غير متاح"
-    
+    row = _get_date_table(target_date.year)[target_date.timetuple().tm_yday - 1]
     return {
-        "gregorian": gregorian,
-        "hijri": hijri
+        "gregorian": row[0],
+        "hijri": row[4]
     }
 
 
@@ -64,6 +141,83 @@ def get_prayer_schedule_date() -> Dict[str, str]:
     return format_date_both_calendars(today)
 
 
+DEFAULT_TIMEZONE = "Europe/Amsterdam"
+
+# Offsets are sampled weekly: DST rules never switch twice within a week, so every
+# sampled interval holds at most one transition, which is then found by bisection.
+_DST_SAMPLE_STEP_SECONDS = 7 * 24 * 3600
+
+
+def _resolve_timezone_key(timezone_name: Optional[str] = None) -> str:
+    """Resolve a timezone name to a valid zoneinfo key, with the historical fallbacks"""
+    if timezone_name is None:
+        # Default to Europe/Amsterdam (common for many mosques)
+        timezone_name = DEFAULT_TIMEZONE
+    
+    try:
+        return ZoneInfo(timezone_name).key
+    except Exception:
+        # Fallback to system timezone or Europe/Amsterdam
+        try:
+            import time
+            tz_name = time.tzname[0] if time.daylight else time.tzname[1]
+            return ZoneInfo(tz_name).key
+        except Exception:
+            return DEFAULT_TIMEZONE
+
+
+@lru_cache(maxsize=64)
+def _get_dst_changes(year: int, timezone_key: str) -> Tuple[bool, Tuple[date, ...], Tuple[bool, ...]]:
+    """
+    Find the days on which the DST status changes during a year.
+    
+    A day's status is the one in effect at 23:00 local time, so a transition in
+    the early morning (2 AM or 3 AM) applies to the day it happens on.
+    
+    Returns:
+        (status on Jan 1, dates where the status changes, status from each of those dates)
+    """
+    tz = ZoneInfo(timezone_key)
+    
+    def state_at(timestamp: int):
+        local = datetime.fromtimestamp(timestamp, tz)
+        return local.utcoffset(), local.dst()
+    
+    start = int(datetime(year, 1, 1, 23, tzinfo=tz).timestamp())
+    end = int(datetime(year, 12, 31, 23, tzinfo=tz).timestamp())
+    
+    initial_state = state_at(start)
+    change_dates: List[date] = []
+    change_flags: List[bool] = []
+    
+    low, low_state = start, initial_state
+    while low < end:
+        high = min(low + _DST_SAMPLE_STEP_SECONDS, end)
+        high_state = state_at(high)
+        if high_state != low_state:
+            # Bisect down to the first second of the new state
+            lo, hi = low, high
+            while hi - lo > 1:
+                mid = (lo + hi) // 2
+                if state_at(mid) == low_state:
+                    lo = mid
+                else:
+                    hi = mid
+            # Only DST changes matter, not changes of the standard offset
+            is_dst = high_state[1].total_seconds() > 0
+            was_dst = low_state[1].total_seconds() > 0
+            if is_dst != was_dst:
+                # First day whose 23:00 falls at or after the transition
+                change_day = datetime.fromtimestamp(hi, tz).date()
+                if datetime(change_day.year, change_day.month, change_day.day, 23, tzinfo=tz).timestamp() < hi:
+                    change_day += timedelta(days=1)
+                change_dates.append(change_day)
+                change_flags.append(is_dst)
+        low, low_state = high, high_state
+    
+    return initial_state[1].total_seconds() > 0, tuple(change_dates), tuple(change_flags)
+
+
 def get_dst_periods(year: int, timezone_name: Optional[str] = None) -> List[Tuple[date, date, bool]]:
     """
     Get Daylight Saving Time (DST) periods for a given year.
@@ -81,59 +235,22 @@ def get_dst_periods(year: int, timezone_name: Optional[str] = None) -> List[Tupl
         - (DST_start, DST_end, True) - DST period
         - (DST_end, Dec 31, False) - Standard time
     """
-    if timezone_name is None:
-        # Default to Europe/Amsterdam (common for many mosques)
-        timezone_name = "Europe/Amsterdam"
-    
-    try:
-        tz = ZoneInfo(timezone_name)
-    except Exception:
-        # Fallback to system timezone or Europe/Paris
-        try:
-            import time
-            tz_name = time.tzname[0] if time.daylight else time.tzname[1]
-            tz = ZoneInfo(tz_name)
-        except Exception:
-            tz = ZoneInfo("Europe/Amsterdam")
+    initial_dst, change_dates, change_flags = _get_dst_changes(year, _resolve_timezone_key(timezone_name))
     
     periods = []
-    current_date = date(year, 1, 1)
-    last_dst = None
     period_start = date(year, 1, 1)
-    
-    # Check each day to find DST transitions
-    # Check at 11 PM (23:00) to determine the DST status for that day
-    # This ensures we capture the status after any transition that happened earlier in the day
-    # DST transitions typically happen at 2 AM or 3 AM, so checking at 11 PM
-    # gives us the status that applies for most of that day
-    while current_date.year == year:
-        dt = datetime.combine(current_date, datetime.min.time().replace(hour=23))
-        dt_tz = dt.replace(tzinfo=tz)
-        is_dst = bool(dt_tz.dst().total_seconds() > 0)
-        
-        if last_dst is None:
-            last_dst = is_dst
-            period_start = current_date
-        
-        if is_dst != last_dst:
-            # DST transition found - the status changed between previous day and current day
-            # The transition happens early morning (2-3 AM) on current_date
-            # So current_date should have the NEW status (after transition)
-            # We end the previous period the day before the transition
-            prev_date = current_date - timedelta(days=1)
-            if period_start <= prev_date:
-                periods.append((period_start, prev_date, last_dst))
-            # Start new period on the transition day with the new status
-            period_start = current_date
-            last_dst = is_dst
-        
-        current_date += timedelta(days=1)
+    current_dst = initial_dst
+    for change_date, is_dst in zip(change_dates, change_flags):
+        # The previous period ends the day before the transition
+        prev_date = change_date - timedelta(days=1)
+        if period_start <= prev_date:
+            periods.append((period_start, prev_date, current_dst))
+        period_start = change_date
+        current_dst = is_dst
     
     # Add final period
-    if period_start:
-        periods.append((period_start, date(year, 12, 31), last_dst))
-    
-    return periods if periods else [(date(year, 1, 1), date(year, 12, 31), False)]
+    periods.append((period_start, date(year, 12, 31), current_dst))
+    return periods
 
 
 def get_dst_transitions(year: int, timezone_name: Optional[str] = None) -> List[date]:
@@ -143,12 +260,25 @@ def get_dst_transitions(year: int, timezone_name: Optional[str] = None) -> List[
     Returns:
         List of dates where DST transitions occur (typically 2 dates: start and end)
     """
-    periods = get_dst_periods(year, timezone_name)
-    transitions = []
+    _, change_dates, _ = _get_dst_changes(year, _resolve_timezone_key(timezone_name))
+    return sorted(set(change_dates))
 
-    for i, (start, end, is_dst) in enumerate(periods):
-        if i > 0:  # Skip first period start (Jan 1)
-            transitions.append(start)
-    
-    return sorted(set(transitions))
 
+def get_dst_flags(dates: Sequence[date], timezone_name: Optional[str] = None) -> List[bool]:
+    """
+    Get the DST status of many dates at once.
+    
+    Args:
+        dates: Dates to look up, in any order and spanning any number of years
+        timezone_name: Optional timezone name, as for get_dst_periods
+    
+    Returns:
+        List of booleans, one per date (True when DST is in effect that day)
+    """
+    timezone_key = _resolve_timezone_key(timezone_name)
+    flags = []
+    for target_date in dates:
+        initial_dst, change_dates, change_flags = _get_dst_changes(target_date.year, timezone_key)
+        index = bisect_right(change_dates, target_date)
+        flags.append(change_flags[index - 1] if index else initial_dst)
+    return flags
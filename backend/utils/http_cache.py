@@ -0,0 +1,92 @@
+"""In-memory cache of serialized JSON responses with ETags and precompressed bodies"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # In requirements.txt; without it responses are only precompressed with gzip
+    brotli = None
+
+
+class CachedResponse:
+    """A serialized JSON body, its strong ETag and its precompressed variants"""
+
+    __slots__ = ("body", "etag", "encoded")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.encoded: Dict[str, bytes] = {"gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(body)
+
+    def _etag_for(self, encoding: Optional[str]) -> str:
+        # Each representation gets its own strong validator
+        return f'"{self.etag}-{encoding}"' if encoding else f'"{self.etag}"'
+
+    def _matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        valid = {self._etag_for(None)} | {self._etag_for(encoding) for encoding in self.encoded}
+        return bool(candidates & valid)
+
+    def to_response(self) -> Response:
+        """Build the response for the current request (304, compressed or identity)"""
+        accepted = request.accept_encodings
+        encoding = next(
+            (name for name in ("br", "gzip") if name in self.encoded and accepted[name]),
+            None,
+        )
+
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and self._matches(if_none_match):
+            response = Response(status=304)
+        else:
+            body = self.encoded[encoding] if encoding else self.body
+            response = Response(body, mimetype="application/json")
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+
+        response.headers["ETag"] = self._etag_for(encoding)
+        response.headers["Vary"] = "Accept-Encoding"
+        # Let the browser keep the body but revalidate it on every load
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+class ResponseCache:
+    """Bounded LRU cache of CachedResponse objects"""
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> CachedResponse:
+        """Get the cached response for key, or serialize `build()` and cache it"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+            self.stats["misses"] += 1
+
+        cached = CachedResponse(current_app.json.dumps(build()).encode("utf-8"))
+        with self._lock:
+            self._entries[key] = cached
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,27 @@
+"""Lazy attribute loading for package __init__ modules"""
+import importlib
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_exports(package: str, exports: Dict[str, str]) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """Build module-level __getattr__ and __dir__ functions for a package.
+
+    `exports` maps each public name to the submodule defining it. The submodule is
+    only imported when the name is first accessed, so importing the package (or one
+    of its submodules) does not pull in the dependencies of all the others.
+    """
+    package_module = importlib.import_module(package)
+
+    def __getattr__(name: str) -> Any:
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(f".{module_name}", package), name)
+        # Cache it so later lookups skip __getattr__
+        setattr(package_module, name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(package_module)) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,74 @@
+"""Reading the end of log files and following them as they grow"""
+import os
+import time
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_BLOCK_SIZE = 8192
+
+# How often a followed file is checked for new data
+DEFAULT_POLL_INTERVAL = 0.5
+
+
+def read_tail(path: str, max_lines: int, block_size: int = DEFAULT_BLOCK_SIZE) -> Tuple[List[str], int]:
+    """Get the last max_lines lines of a file and the offset they end at.
+
+    Reads fixed-size blocks backwards from the end, so the cost depends on the
+    number of lines requested, not on the size of the file.
+    """
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        if max_lines <= 0:
+            return [], end
+
+        position = end
+        data = b""
+        # One more newline than lines wanted guarantees the first kept line is complete
+        while position > 0 and data.count(b"\n") <= max_lines:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+
+    lines = data.splitlines(keepends=True)[-max_lines:]
+    return [line.decode("utf-8", errors="replace") for line in lines], end
+
+
+def tail_lines(path: str, max_lines: int, block_size: int = DEFAULT_BLOCK_SIZE) -> List[str]:
+    """Get the last max_lines lines of a file"""
+    return read_tail(path, max_lines, block_size)[0]
+
+
+def follow_file(path: str, offset: int = 0, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                timeout: Optional[float] = None) -> Iterator[Optional[str]]:
+    """Yield the lines appended to a file after `offset`, as they are written.
+
+    Yields None whenever a poll found nothing new, so callers can send keep-alives
+    or stop. A file that shrinks (e.g. truncated by cron's `>` at the next run) is
+    read again from the start; a missing file is waited for. Stops after `timeout`
+    seconds if given.
+    """
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    pending = b""
+    while deadline is None or time.monotonic() < deadline:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+
+        if size is not None and size < offset:
+            offset, pending = 0, b""
+
+        if size is not None and size > offset:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(size - offset)
+            offset += len(data)
+            *lines, pending = (pending + data).split(b"\n")
+            for line in lines:
+                yield line.decode("utf-8", errors="replace") + "\n"
+            if lines:
+                continue
+
+        yield None
+        time.sleep(poll_interval)
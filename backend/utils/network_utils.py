@@ -20,3 +20,7 @@ def get_local_ip():
         except Exception:
             return "localhost"
 
+
+def get_media_url(filename: str, port: int = 3001) -> str:
+    """Get the URL under which Chromecasts can fetch an uploaded file"""
+    return f"http://{get_local_ip()}:{port}/api/files/{filename}"
@@ -0,0 +1,187 @@
+"""Compact, array-backed representation of a yearly prayer calendar"""
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+# Slot order of the Mawaqit calendar: [Fajr, Shuruq, Dhuhr, Asr, Maghrib, Isha]
+PRAYER_SLOTS = ("fajr", "shuruq", "dhuhr", "asr", "maghrib", "isha")
+SLOT_COUNT = len(PRAYER_SLOTS)
+
+# Days are laid out as in a leap year so Feb 29 always has a slot
+DAYS_PER_YEAR = 366
+MISSING = 0xFFFF
+
+# Binary layout: 80-byte header, then DAYS_PER_YEAR * SLOT_COUNT little-endian uint16
+BINARY_MAGIC = b"PCAL"
+BINARY_VERSION = 1
+_HEADER = struct.Struct("<4sHHH64s")
+HEADER_SIZE = 80
+
+_MONTH_LENGTHS = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+_MONTH_OFFSETS = tuple(sum(_MONTH_LENGTHS[:i]) for i in range(12))
+
+Minutes = Tuple[Optional[int], ...]
+
+logger = logging.getLogger(__name__)
+
+
+class PrayerCalendarError(ValueError):
+    """Raised when a calendar payload or binary file is malformed"""
+
+
+def parse_time(value: str) -> int:
+    """Parse "HH:MM" into minutes since midnight"""
+    try:
+        hour, minute = map(int, value.split(":"))
+    except (AttributeError, ValueError):
+        raise PrayerCalendarError(f"Invalid time: {value!r}")
+    if not (0 <= hour <= 23 and 0 <= minute <= 59):
+        raise PrayerCalendarError(f"Invalid time: {value!r}")
+    return hour * 60 + minute
+
+
+def format_time(minutes: int) -> str:
+    """Format minutes since midnight as "HH:MM" """
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def day_index(target_date: date) -> int:
+    """Get the row of a date in the leap-year layout (Jan 1 = 0, Feb 29 = 59, Dec 31 = 365)"""
+    return _MONTH_OFFSETS[target_date.month - 1] + target_date.day - 1
+
+
+class PrayerCalendar:
+    """A year of prayer times as a 366 x 6 matrix of minutes since midnight.
+
+    The upstream payload is parsed and validated once; lookups are then plain
+    array indexing. The matrix can be written to a small binary file and
+    memory-mapped back without parsing.
+    """
+
+    __slots__ = ("_minutes", "content_hash", "_mmap")
+
+    def __init__(self, minutes: Union[array, memoryview], content_hash: str = "", _mmap: Optional[mmap.mmap] = None):
+        if len(minutes) != DAYS_PER_YEAR * SLOT_COUNT:
+            raise PrayerCalendarError(f"Expected {DAYS_PER_YEAR * SLOT_COUNT} values, got {len(minutes)}")
+        self._minutes = minutes
+        self.content_hash = content_hash
+        self._mmap = _mmap
+
+    @classmethod
+    def from_calendar(cls, calendar: Any, content_hash: str = "") -> "PrayerCalendar":
+        """Build from the Mawaqit `calendar` array (12 month objects keyed by day number).
+
+        Structural errors raise PrayerCalendarError; a day with an unreadable time is
+        left missing like an incomplete one.
+        """
+        if not isinstance(calendar, list) or len(calendar) != 12:
+            raise PrayerCalendarError("Calendar must be a list of 12 months")
+
+        minutes = array("H", [MISSING]) * (DAYS_PER_YEAR * SLOT_COUNT)
+        for month_index, month_data in enumerate(calendar):
+            if not isinstance(month_data, dict):
+                raise PrayerCalendarError(f"Month {month_index + 1} is not an object")
+            for day_key, day_times in month_data.items():
+                try:
+                    day = int(day_key)
+                except (TypeError, ValueError):
+                    raise PrayerCalendarError(f"Invalid day {day_key!r} in month {month_index + 1}")
+                if not 1 <= day <= _MONTH_LENGTHS[month_index]:
+                    raise PrayerCalendarError(f"Invalid day {day} in month {month_index + 1}")
+                # Same leniency as the old per-day lookup: incomplete days are left empty
+                if not isinstance(day_times, list) or len(day_times) < SLOT_COUNT:
+                    continue
+                try:
+                    day_minutes = [parse_time(value) for value in day_times[:SLOT_COUNT]]
+                except PrayerCalendarError as e:
+                    logger.warning(f"Skipping {month_index + 1}/{day} in calendar: {e}")
+                    continue
+                row = (_MONTH_OFFSETS[month_index] + day - 1) * SLOT_COUNT
+                minutes[row:row + SLOT_COUNT] = array("H", day_minutes)
+        return cls(minutes, content_hash)
+
+    @classmethod
+    def from_payload(cls, payload: Optional[Dict[str, Any]], content_hash: str = "") -> Optional["PrayerCalendar"]:
+        """Build from a Mawaqit prayer-times payload, or None if it has no calendar"""
+        if not payload or not payload.get("calendar"):
+            return None
+        return cls.from_calendar(payload["calendar"], content_hash)
+
+    def minutes_for(self, target_date: date) -> Minutes:
+        """Get the six slots of a date as minutes since midnight (None when missing)"""
+        row = day_index(target_date) * SLOT_COUNT
+        return tuple(None if m == MISSING else m for m in self._minutes[row:row + SLOT_COUNT])
+
+    def has_day(self, target_date: date) -> bool:
+        return all(m is not None for m in self.minutes_for(target_date))
+
+    def times_for(self, target_date: date, include_shuruq: bool = True) -> Dict[str, str]:
+        """Get the prayer times of a date as {"fajr": "HH:MM", ...}, or {} if the day is missing"""
+        minutes = self.minutes_for(target_date)
+        if any(m is None for m in minutes):
+            return {}
+        return {
+            prayer: format_time(m)
+            for prayer, m in zip(PRAYER_SLOTS, minutes)
+            if include_shuruq or prayer != "shuruq"
+        }
+
+    def iter_days(self, start: date, end: date) -> Iterator[Tuple[date, Minutes]]:
+        """Yield (date, minutes) for every complete day from start to end inclusive"""
+        current = start
+        while current <= end:
+            minutes = self.minutes_for(current)
+            if all(m is not None for m in minutes):
+                yield current, minutes
+            current += timedelta(days=1)
+
+    def slice(self, start: date, end: date) -> Dict[date, Minutes]:
+        """Get the complete days from start to end inclusive"""
+        return dict(self.iter_days(start, end))
+
+    def to_bytes(self) -> bytes:
+        """Serialize to the binary format"""
+        header = _HEADER.pack(
+            BINARY_MAGIC, BINARY_VERSION, DAYS_PER_YEAR, SLOT_COUNT, self.content_hash.encode("ascii")
+        ).ljust(HEADER_SIZE, b"\0")
+        values = array("H", self._minutes)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return header + values.tobytes()
+
+    @classmethod
+    def from_bytes(cls, buffer: Union[bytes, memoryview, mmap.mmap], _mmap: Optional[mmap.mmap] = None) -> "PrayerCalendar":
+        """Deserialize from the binary format, without copying on little-endian hosts"""
+        if len(buffer) != HEADER_SIZE + DAYS_PER_YEAR * SLOT_COUNT * 2:
+            raise PrayerCalendarError("Invalid calendar file size")
+        magic, version, days, slots, content_hash = _HEADER.unpack_from(buffer)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION or days != DAYS_PER_YEAR or slots != SLOT_COUNT:
+            raise PrayerCalendarError("Unsupported calendar file")
+
+        content_hash = content_hash.rstrip(b"\0").decode("ascii")
+        data = memoryview(buffer)[HEADER_SIZE:]
+        if sys.byteorder == "little":
+            minutes = data.cast("H")
+        else:
+            minutes = array("H", data.tobytes())
+            minutes.byteswap()
+        return cls(minutes, content_hash, _mmap)
+
+    def save(self, path: str):
+        """Write the binary format atomically"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "PrayerCalendar":
+        """Memory-map a binary calendar file"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_bytes(mapped, mapped)
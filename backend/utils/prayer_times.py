@@ -1,9 +1,12 @@
 """Prayer time transformation utilities"""
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 
+from backend.utils.prayer_calendar import PrayerCalendar
 
-def extract_prayer_times_from_calendar(calendar: List[Dict], date: Optional[datetime] = None) -> Dict[str, str]:
+
+def extract_prayer_times_from_calendar(calendar: Union[List[Dict], PrayerCalendar],
+                                       date: Optional[datetime] = None) -> Dict[str, str]:
     """Extract prayer times from calendar array structure.
     
     Calendar structure:
@@ -12,12 +15,15 @@ def extract_prayer_times_from_calendar(calendar: List[Dict], date: Optional[date
     - Each day has an array of 6 times: [Fajr, Shuruq, Dhuhr, Asr, Maghrib, Isha]
     
     Args:
-        calendar: Array of month objects
+        calendar: Array of month objects, or an already parsed PrayerCalendar
         date: datetime object (defaults to today)
     
     Returns:
         Dict with prayer names as keys and times as values
     """
+    if isinstance(calendar, PrayerCalendar):
+        return calendar.times_for(date or datetime.now())
+
     if not calendar or not isinstance(calendar, list) or len(calendar) == 0:
         return {}
     
@@ -51,21 +57,31 @@ def extract_prayer_times_from_calendar(calendar: List[Dict], date: Optional[date
     }
 
 
-def transform_prayer_times(prayer_times: Dict[str, Any]) -> Dict[str, str]:
+def transform_prayer_times(prayer_times: Union[Dict[str, Any], PrayerCalendar, None],
+                           calendar: Optional[PrayerCalendar] = None) -> Dict[str, str]:
     """Transform prayer times from API format to simple string format.
     
     The API may return prayer times in different formats:
-    1. Calendar array structure (preferred if available)
+    1. Calendar array structure (preferred if available), or its parsed PrayerCalendar
     2. Objects with day numbers (1-31) as keys
     3. Simple string values
     
-    This function extracts today's prayer times or the first available day.
+    This function extracts today's prayer times or the first available day. A
+    `calendar` without today falls back to the raw `prayer_times` payload. Returns
+    {} when no time was found, which callers must not schedule or store.
     """
+    today = datetime.now()
+
+    if isinstance(prayer_times, PrayerCalendar):
+        calendar, prayer_times = prayer_times, None
+    if calendar is not None:
+        calendar_times = calendar.times_for(today, include_shuruq=False)
+        if any(calendar_times.values()):
+            return calendar_times
+
     if not prayer_times:
         return {}
     
-    today = datetime.now()
-    
     # First, try to extract from calendar if available
     if "calendar" in prayer_times and prayer_times["calendar"]:
         calendar_times = extract_prayer_times_from_calendar(prayer_times["calendar"], today)
@@ -107,5 +123,7 @@ def transform_prayer_times(prayer_times: Dict[str, Any]) -> Dict[str, str]:
         else:
             transformed[prayer] = None
     
+    if not any(transformed.values()):
+        return {}
     return transformed
 
@@ -5,10 +5,14 @@ import type {
   ChromecastDevice,
   FileInfo,
   CronJob,
+  TestJob,
 } from "../types";
 
 const API_BASE = import.meta.env.VITE_API_URL || "/api";
 
+// How often a test play job is polled until it finishes
+const JOB_POLL_INTERVAL_MS = 1000;
+
 // API Functions
 export const api = {
   // Config
@@ -96,6 +100,29 @@ export const api = {
       body: JSON.stringify(data),
     });
     if (!response.ok) throw new Error("Failed to play adhan");
+    // The play runs in the background; wait for its job to finish
+    let job: TestJob = await response.json();
+    while (job.state === "queued" || job.state === "running") {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+      job = await api.getTestJob(job.id);
+    }
+    if (job.state !== "succeeded") {
+      throw new Error(job.error || `Test play ${job.state}`);
+    }
+  },
+
+  getTestJob: async (jobId: string): Promise<TestJob> => {
+    const response = await fetch(`${API_BASE}/test/jobs/${jobId}`);
+    if (!response.ok) throw new Error("Failed to load test play status");
+    return response.json();
+  },
+
+  cancelTestJob: async (jobId: string): Promise<TestJob> => {
+    const response = await fetch(`${API_BASE}/test/jobs/${jobId}`, {
+      method: "DELETE",
+    });
+    if (!response.ok) throw new Error("Failed to cancel test play");
+    return response.json();
   },
 
   // Cron jobs
@@ -24,6 +24,10 @@ export type AdhanVolumes = {
   [key: string]: number | null;
 };
 
+export type ChromecastTargets = {
+  [key: string]: string[] | null;
+};
+
 export type FileInfo = {
   name: string;
   size: number;
@@ -38,6 +42,18 @@ export type CronJob = {
   executed_today?: boolean;
 };
 
+export type TestJob = {
+  id: string;
+  kind: string;
+  state: "queued" | "running" | "succeeded" | "failed" | "cancelled";
+  step?: string | null;
+  error?: string | null;
+  created_at: string;
+  started_at?: string | null;
+  finished_at?: string | null;
+  duration_seconds?: number | null;
+};
+
 export type PrayerScheduleDate = {
   gregorian: string;
   hijri: string;
@@ -46,6 +62,7 @@ export type PrayerScheduleDate = {
 export type Config = {
   mosque?: Mosque;
   chromecast?: ChromecastDevice;
+  chromecast_targets?: ChromecastTargets;
   adhan_files?: AdhanFiles;
   adhan_volumes?: AdhanVolumes;
   prayer_times?: PrayerTimes;